@@ -0,0 +1,115 @@
+# apps/backend/api/_batcher.py
+
+import asyncio
+
+
+class AsyncBatcher:
+    """
+    Coalesce concurrent submissions into batched handler calls.
+
+    Items submitted within `batch_wait_timeout_s` of the first queued item
+    (up to `max_batch_size`) are passed together to `handler`, an async
+    callable taking a list of items and returning one result per item in
+    the same order. A result that is an exception is raised to that
+    caller only.
+
+    Submissions with the same non-None `key` while one is still pending
+    share its result instead of being queued again.
+    """
+
+    def __init__(self, handler, max_batch_size=32, batch_wait_timeout_s=0.1):
+        self._handler = handler
+        self.max_batch_size = max_batch_size
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._pending = {}
+        self._dispatching = set()
+
+    async def start(self):
+        """Start the background worker on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._pending = {}
+        self._worker = loop.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the worker and in-flight batches; callers still waiting get CancelledError."""
+        tasks = list(self._dispatching)
+        if self._worker is not None:
+            tasks.append(self._worker)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+        self._dispatching.clear()
+
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.cancel()
+        self._pending = {}
+
+    async def submit(self, item, key=None):
+        """Queue `item` and wait for its result."""
+        # Started lazily as well, so the batcher also works without the
+        # app lifespan (scripts, per-request event loops in tests)
+        await self.start()
+
+        if key is not None and key in self._pending:
+            return await asyncio.shield(self._pending[key])
+
+        fut = self._loop.create_future()
+        if key is not None:
+            self._pending[key] = fut
+            fut.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        await self._queue.put((item, fut))
+        return await asyncio.shield(fut)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.batch_wait_timeout_s
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            task = self._loop.create_task(self._dispatch(batch))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        futures = [fut for _, fut in batch]
+
+        try:
+            try:
+                results = await self._handler(items)
+            except Exception as e:
+                results = [e] * len(items)
+
+            for fut, result in zip(futures, results):
+                if fut.done():
+                    continue
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+        finally:
+            # Cancelled (or a BaseException escaped the handler): never leave
+            # callers waiting on a batch that will not resolve
+            for fut in futures:
+                if not fut.done():
+                    fut.cancel()
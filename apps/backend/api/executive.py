@@ -1,57 +1,89 @@
-from fastapi import APIRouter, HTTPException
+from functools import lru_cache
+
 import pandas as pd
+from fastapi import APIRouter, HTTPException
 
+from apps.backend.responses import ORJSONResponse
+from apps.backend.routing import ORJSONRoute
 from apps.backend.schemas.requests import ExecutiveSummaryRequest
+from apps.backend.utils.frames import (
+    key_index,
+    lookup_by_keys,
+    normalize_keys,
+    records_to_frame,
+)
 from src.agentic_ai.narrative_agent import NarrativeAgent
 
-router = APIRouter(tags=["Executive"])
+router = APIRouter(
+    tags=["Executive"],
+    default_response_class=ORJSONResponse,
+    route_class=ORJSONRoute,
+)
+
+
+@lru_cache(maxsize=1)
+def _narrative_agent() -> NarrativeAgent:
+    return NarrativeAgent()  # rule-based only
+
+
+def _lookup_unique(reorder_df, table, value_col, index, payload_name):
+    """
+    Per-key lookup that rejects tables with repeated (facility, item)
+    rows instead of silently picking one of them.
+    """
+    try:
+        return lookup_by_keys(
+            reorder_df, table, value_col, index=index, validate=True
+        )
+    except pd.errors.MergeError:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"'{payload_name}' payload must have one row per "
+                "(facility, item); roll it up before sending"
+            ),
+        )
+
 
 @router.post("/summary")
 def executive_summary(request: ExecutiveSummaryRequest):
 
-    reorder_df = pd.DataFrame(request.reorder)
-    vol_df = pd.DataFrame(request.volatility)
-    risk_df = pd.DataFrame(request.inventory_risk)
+    reorder_df = records_to_frame(request.reorder)
+    vol_df = records_to_frame(request.volatility)
+    risk_df = records_to_frame(request.inventory_risk)
 
     if reorder_df.empty:
         raise HTTPException(
             status_code=400,
             detail="Empty reorder payload received"
         )
+    reorder_df = normalize_keys(reorder_df, ("facility", "item"))
+    # Built once, reused by every per-key lookup below
+    reorder_keys = key_index(reorder_df)
+
     # -----------------------------
     # Merge volatility into reorder
     # -----------------------------
     if not vol_df.empty:
-        for c in ["facility", "item"]:
-            reorder_df[c] = reorder_df[c].astype(str).str.strip().str.lower()
-            vol_df[c] = vol_df[c].astype(str).str.strip().str.lower()
+        vol_df = normalize_keys(vol_df, ("facility", "item"))
 
         # Normalize volatility column name
         if "volatility_class" not in vol_df.columns and "volatility" in vol_df.columns:
             vol_df = vol_df.rename(columns={"volatility": "volatility_class"})
 
-        reorder_df = reorder_df.merge(
-            vol_df[["facility", "item", "volatility_class"]],
-            on=["facility", "item"],
-            how="left"
-        )   
+        reorder_df["volatility_class"] = _lookup_unique(
+            reorder_df, vol_df, "volatility_class", reorder_keys, "volatility"
+        )
 
     # -----------------------------
     # Inventory risk (item-level)
     # -----------------------------
     if not risk_df.empty:
-        for c in ["facility", "item"]:
-            risk_df[c] = risk_df[c].astype(str).str.strip().str.lower()
-        # Count risks
-        high_risk = risk_df[risk_df["inventory_risk"] == "HIGH"]
-        medium_risk = risk_df[risk_df["inventory_risk"] == "MEDIUM"]
-        low_risk = risk_df[risk_df["inventory_risk"] == "LOW"]
+        risk_df = normalize_keys(risk_df, ("facility", "item"))
 
         # Attach executive flags to reorder_df for narrative context
-        reorder_df = reorder_df.merge(
-            risk_df[["facility", "item", "inventory_risk"]],
-            on=["facility", "item"],
-            how="left"
+        reorder_df["inventory_risk"] = _lookup_unique(
+            reorder_df, risk_df, "inventory_risk", reorder_keys, "inventory_risk"
         )
 
         reorder_df["executive_flag"] = reorder_df["inventory_risk"].fillna("UNKNOWN")
@@ -60,15 +92,14 @@ def executive_summary(request: ExecutiveSummaryRequest):
     # -----------------------------
     # Generate narrative
     # -----------------------------
-    agent = NarrativeAgent()  # rule-based only
-    summary = agent.generate_coo_summary(
+    summary = _narrative_agent().generate_coo_summary(
         reorder_df=reorder_df,
         horizon_days=request.horizon_days
     )
 
-    return {
+    return ORJSONResponse({
         "status": "success",
         "summary": summary
-    }
+    })
     
 
@@ -1,10 +1,39 @@
 # apps/backend/api/forecast.py
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from threading import Lock
+from typing import Literal, Optional
+
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+import numpy as np
 import pandas as pd
-
+import pyarrow as pa
+
+from apps.backend.api._batcher import AsyncBatcher
+from apps.backend.responses import (
+    ORJSONResponse,
+    arrow_stream_response,
+    frame_payload,
+    ndjson_stream_response,
+    wants_arrow,
+)
+from apps.backend.routing import ORJSONRoute
 from apps.backend.schemas.requests import BatchForecastRequest
-from src.agentic_ai.forecast_agent import ForecastAgent
+from apps.backend.utils.frames import (
+    downcast_numeric,
+    key_index,
+    lookup_by_keys,
+    normalize_keys,
+    records_to_frame,
+)
+from src.agentic_ai.forecast_agent import ForecastAgent, warm_forecast_worker
 from src.agentic_ai.reorder_agent import ReorderAgent
 from src.ai_core.data_pipeline import preprocess_data
 from src.ai_core.volatility import classify_volatility
@@ -16,28 +45,155 @@ from src.agentic_ai.explainable_reorder import ExplainableReorderAgent
 from src.agentic_ai.scenario_agent import ScenarioAgent
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse, route_class=ORJSONRoute)
+
+
+# --------------------------------------------------
+# Pipeline stages
+# --------------------------------------------------
+# Volatility, forecasting, lead time and starting stock only depend on the
+# preprocessed/raw frames, so the handler runs them concurrently. The
+# pandas/sklearn work inside them releases the GIL often enough for
+# threads to overlap.
+_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="batch-stage")
+
+# Per-group model fits, shared by all requests. Kept separate from _POOL:
+# the forecast stage itself runs on _POOL and blocks on these tasks.
+# RF fits only partly release the GIL, so FORECAST_PROCESSES=1 moves them
+# to a spawned process pool (start_forecast_pool, from the lifespan).
+# Spawned workers re-import the launching script, so that script must
+# start the app under an `if __name__ == "__main__":` guard; it is off
+# by default and fits stay on this thread pool.
+FORECAST_PROCESSES = os.getenv("FORECAST_PROCESSES", "0") == "1"
+_FORECAST_WORKERS = os.cpu_count() or 1
+_FORECAST_POOL = ThreadPoolExecutor(
+    max_workers=_FORECAST_WORKERS, thread_name_prefix="forecast"
+)
+_forecast_processes = None
+
+
+# Guards every swap of _forecast_processes (lifespan and broken-pool restarts
+# from _POOL threads)
+_forecast_pool_lock = Lock()
+
+
+def _new_forecast_pool() -> ProcessPoolExecutor:
+    n = _FORECAST_WORKERS
+    pool = ProcessPoolExecutor(
+        max_workers=n,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=warm_forecast_worker,
+    )
+    # Workers spawn on demand; bring them all up now, not on the first request
+    for _ in range(n):
+        pool.submit(int)
+    return pool
+
+
+def start_forecast_pool():
+    """
+    Start the forecast worker processes (spawned, imports preloaded) when
+    FORECAST_PROCESSES is enabled.
+    """
+    global _forecast_processes
+    if not FORECAST_PROCESSES:
+        return
+    with _forecast_pool_lock:
+        if _forecast_processes is None:
+            _forecast_processes = _new_forecast_pool()
 
 
-def _normalize_keys(df: pd.DataFrame, cols=("facility", "item")) -> pd.DataFrame:
-    """Normalize merge keys consistently across all tables."""
-    df = df.copy()
-    for c in cols:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip().str.lower()
-    return df
+def stop_forecast_pool(wait: bool = True):
+    global _forecast_processes
+    with _forecast_pool_lock:
+        pool, _forecast_processes = _forecast_processes, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
 
 
-@router.post("/batch")
-def batch_forecast(request: BatchForecastRequest):
+def _replace_forecast_pool(broken) -> None:
     """
-    Multi-item, multi-facility batch forecast endpoint.
-    Fully self-contained: validates, preprocesses, forecasts, reorders.
+    Swap a broken process pool for a fresh one. Only the first caller to
+    report a given pool replaces it; later reports of the same (already
+    replaced) pool, or of a thread pool, are no-ops.
     """
+    global _forecast_processes
+    with _forecast_pool_lock:
+        if broken is None or broken is not _forecast_processes:
+            return
+        _forecast_processes = _new_forecast_pool()
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+# records-format response building; leaf tasks only, never waits on _POOL
+_RECORDS_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="records")
+
+
+def _to_records(df: pd.DataFrame) -> list:
+    return df.to_dict(orient="records")
+
+
+@lru_cache(maxsize=1)
+def _forecast_agent() -> ForecastAgent:
+    return ForecastAgent()
+
+
+@lru_cache(maxsize=1)
+def _reorder_agent() -> ReorderAgent:
+    return ReorderAgent()
+
+
+# Map numeric-style volatility to planning semantics
+_VOLATILITY_CLASS = {
+    "Low": "Stable",
+    "Medium": "Seasonal",
+    "High": "Erratic",
+}
+
+# Inventory risk levels, least to most severe
+_RISK_LEVEL = pd.CategoricalDtype(["LOW", "MEDIUM", "HIGH"], ordered=True)
+
+
+# Identical payloads are often re-posted within seconds (dashboard
+# refreshes, retries). Deterministic stages are memoized on a content
+# hash of the normalized raw frame.
+_STAGE_CACHE = TTLCache(maxsize=32, ttl=300)
+_STAGE_CACHE_LOCK = Lock()
+
+
+def _frame_digest(df: pd.DataFrame):
+    """Content hash of a frame (values + column names), or None if unhashable."""
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except TypeError:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(df.columns.tolist()).encode())
+    h.update(row_hashes.tobytes())
+    return h.hexdigest()
+
+
+def _memoized(key, compute):
+    """Return a shallow copy of the cached result for `key`, computing it on a miss."""
+    if key is None:
+        return compute()
+
+    with _STAGE_CACHE_LOCK:
+        result = _STAGE_CACHE.get(key)
+    if result is None:
+        result = compute()
+        with _STAGE_CACHE_LOCK:
+            _STAGE_CACHE[key] = result
+    return result.copy(deep=False)
+
+
+def _load_stage(request: BatchForecastRequest, df_raw: pd.DataFrame = None) -> pd.DataFrame:
+    """Payload (or an already decoded frame) -> validated raw frame with normalized keys."""
     # --------------------------------------------------
     # 1) Load payload
     # --------------------------------------------------
-    df_raw = pd.DataFrame(request.data)
+    if df_raw is None:
+        df_raw = records_to_frame(request.data)
     if df_raw.empty:
         raise HTTPException(status_code=400, detail="Empty dataset received")
 
@@ -57,92 +213,491 @@ def batch_forecast(request: BatchForecastRequest):
         )
 
     # ✅ Normalize raw keys ASAP (so everything downstream is consistent)
-    df_raw = _normalize_keys(df_raw, ("facility", "item"))
+    df_raw = normalize_keys(df_raw, ("facility", "item"))
 
     # Make lead_time numeric if present
     if "lead_time_days" in df_raw.columns:
         df_raw["lead_time_days"] = pd.to_numeric(df_raw["lead_time_days"], errors="coerce")
 
-    # --------------------------------------------------
-    # 3) Preprocess (creates ds, y, day_of_week, month)
-    # --------------------------------------------------
-    df = preprocess_data(
-        df_raw,
-        date_col=request.date_col,
-        target_col=request.demand_col,
-    )
+    # Halve the bytes touched by every later vectorized pass
+    df_raw = downcast_numeric(df_raw, skip=("facility", "item", request.date_col))
 
-    # Ensure preprocessed keys still normalized (defensive)
-    df = _normalize_keys(df, ("facility", "item"))
+    return df_raw
 
-    # --------------------------------------------------
-    # 4) Volatility classification (FIXED & ALIGNED)
-    # --------------------------------------------------
-    try:
-        vol_df = classify_volatility(df, y_col="y", group_cols=("facility", "item"))
 
-        # 🔑 Map numeric-style volatility to planning semantics
-        vol_map = {
-            "Low": "Stable",
-            "Medium": "Seasonal",
-            "High": "Erratic",
-        }
+def _preprocess_stage(df_raw: pd.DataFrame, date_col: str, demand_col: str):
+    """Preprocess (creates ds, y, day_of_week, month); returns (df, payload digest)."""
+    # Parse dates up front so df_raw looks the same on cache hits and misses
+    df_raw[date_col] = pd.to_datetime(df_raw[date_col])
+    digest = _frame_digest(df_raw)
 
-        vol_df["volatility_class"] = vol_df["volatility"].map(vol_map)
+    def compute():
+        # Keys stay normalized categoricals from df_raw
+        return preprocess_data(df_raw, date_col=date_col, target_col=demand_col)
 
+    key = None if digest is None else ("preprocess", digest, date_col, demand_col)
+    return _memoized(key, compute), digest
+
+
+def _volatility_stage(df: pd.DataFrame, cache_key=None) -> pd.DataFrame:
+    def compute():
+        vol_df = classify_volatility(df, y_col="y", group_cols=("facility", "item"))
+        # Renames the few categories, not every row; "Unknown" has no class
+        vol_df["volatility_class"] = (
+            vol_df["volatility"].cat.rename_categories(_VOLATILITY_CLASS)
+            .cat.remove_categories("Unknown")
+        )
+        return vol_df
+
+    try:
+        return _memoized(cache_key, compute)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Volatility classification failed: {str(e)}"
         )
 
-    # --------------------------------------------------
-    # 5) Agents
-    # --------------------------------------------------
-    forecast_agent = ForecastAgent()
-    reorder_agent = ReorderAgent()
 
-    # --------------------------------------------------
-    # 6) Batch forecast
-    # --------------------------------------------------
+def _forecast_parallelism(n_groups: int, executor=None) -> dict:
+    """Pool/batch settings for run_batch_forecast sized to the workload."""
+    if n_groups < ForecastAgent._PARALLEL_MIN_GROUPS:
+        return {"parallel": False}
+    # Both pools run _FORECAST_WORKERS workers; aim for ~4 tasks per busy worker
+    busy = min(_FORECAST_WORKERS, n_groups)
+    return {
+        "parallel": True,
+        "executor": executor or _forecast_processes or _FORECAST_POOL,
+        "batch_size": max(1, n_groups // (4 * busy)),
+    }
+
+
+def _run_forecast(df: pd.DataFrame, horizon: int, group_cols=("facility", "item")) -> dict:
+    # Only series run_batch_forecast will actually fit
+    sizes = df.groupby(list(group_cols), sort=False, observed=True).size()
+    n_groups = int((sizes >= ForecastAgent._MIN_SERIES_ROWS).sum())
+    parallelism = _forecast_parallelism(n_groups)
     try:
-        output = forecast_agent.run_batch_forecast(
+        return _forecast_agent().run_batch_forecast(
             df=df,
-            periods=request.horizon,
-            parallel=True,
-            max_workers=4
+            periods=horizon,
+            group_cols=group_cols,
+            **parallelism,
         )
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed): replace the pool for later
+        # requests and finish this one on threads
+        _replace_forecast_pool(parallelism.get("executor"))
+        return _forecast_agent().run_batch_forecast(
+            df=df,
+            periods=horizon,
+            group_cols=group_cols,
+            **_forecast_parallelism(n_groups, executor=_FORECAST_POOL),
+        )
+
+
+def _forecast_stage(df: pd.DataFrame, horizon: int):
+    try:
+        output = _run_forecast(df, horizon)
         batch_forecast_df = output["forecast"]
         metrics_df = output["metrics"]
 
-        # ✅ Normalize forecast keys too (in case ForecastAgent changes formatting)
-        batch_forecast_df = _normalize_keys(batch_forecast_df, ("facility", "item"))
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch forecasting failed: {str(e)}")
+    return batch_forecast_df, metrics_df
 
-    # --------------------------------------------------
-    # 7) Lead-time DF (from RAW) + normalize BEFORE merge
-    # --------------------------------------------------
+
+def _forecast_or_error(df: pd.DataFrame, horizon: int):
+    try:
+        return _forecast_stage(df, horizon)
+    except Exception as e:
+        return e
+
+
+def _forecast_many(items: list) -> list:
+    """
+    Forecast several requests' preprocessed frames together.
+
+    `items` are (df, horizon) pairs. Frames sharing a horizon go through a
+    single run_batch_forecast call, split per request by a `_req_id`
+    group column. Returns one (forecast, metrics) tuple, or the exception
+    a standalone call would have raised, per item.
+    """
+    results = [None] * len(items)
+    by_horizon = {}
+    for i, (_, horizon) in enumerate(items):
+        by_horizon.setdefault(horizon, []).append(i)
+
+    for horizon, idxs in by_horizon.items():
+        if len(idxs) == 1:
+            results[idxs[0]] = _forecast_or_error(items[idxs[0]][0], horizon)
+            continue
+
+        group_cols = ["_req_id", "facility", "item"]
+        try:
+            combined = pd.concat(
+                [items[i][0].assign(_req_id=i) for i in idxs],
+                ignore_index=True,
+            )
+            output = _run_forecast(combined, horizon, group_cols=group_cols)
+        except Exception:
+            # One bad payload must not fail the rest of the batch
+            for i in idxs:
+                results[i] = _forecast_or_error(items[i][0], horizon)
+            continue
+
+        forecasts = dict(tuple(output["forecast"].groupby("_req_id", sort=False)))
+        metrics = dict(tuple(output["metrics"].groupby("_req_id", sort=False)))
+        for i in idxs:
+            if i not in forecasts:
+                # No forecastable group: reproduce the standalone error
+                results[i] = _forecast_or_error(items[i][0], horizon)
+                continue
+            # Concatenating requests with different key categories falls
+            # back to object keys; restore the categorical dtype
+            batch_forecast_df = forecasts[i].drop(columns="_req_id").reset_index(drop=True)
+            results[i] = (
+                normalize_keys(batch_forecast_df, ("facility", "item")),
+                metrics[i].drop(columns="_req_id").reset_index(drop=True),
+            )
+
+    return results
+
+
+async def _forecast_batch(items: list) -> list:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_POOL, _forecast_many, items)
+
+
+# Concurrent /batch requests arriving within 100 ms share one forecast
+# run; identical payloads in flight share one result. Started/stopped by
+# the app lifespan (apps/backend/main.py).
+forecast_batcher = AsyncBatcher(
+    _forecast_batch, max_batch_size=32, batch_wait_timeout_s=0.1
+)
+
+
+def _lead_time_stage(df_raw: pd.DataFrame) -> pd.DataFrame:
     if "lead_time_days" in df_raw.columns:
+        # Aggregate in float64: the raw column may be downcast to float32
         lead_time_df = (
-            df_raw
-            .groupby(["facility", "item"], as_index=False)
-            .agg({"lead_time_days": "mean"})
+            df_raw["lead_time_days"].astype(np.float64)
+            .groupby([df_raw["facility"], df_raw["item"]], sort=False, observed=True)
+            .mean()
+            .reset_index()
         )
     else:
         lead_time_df = pd.DataFrame(columns=["facility", "item", "lead_time_days"])
 
-    lead_time_df = _normalize_keys(lead_time_df, ("facility", "item"))
+    return lead_time_df
+
+
+# Fallback stock columns, in order of preference
+_STOCK_COL_CANDIDATES = [
+    "stock_on_hand",
+    "current_stock",
+    "on_hand",
+    "stock"
+]
+
+
+def _inventory_stage(df_raw: pd.DataFrame, request: BatchForecastRequest) -> pd.DataFrame:
+    """Starting stock per (facility, item) for the simulation."""
+
+    def _no_stock(reason: str) -> HTTPException:
+        return HTTPException(
+            status_code=400,
+            detail={
+                "error": "Inventory simulation skipped",
+                "reason": reason,
+                "received_columns": df_raw.columns.tolist(),
+                "expected_columns": _STOCK_COL_CANDIDATES,
+                "request_stock_col": request.stock_col
+            }
+        )
+
+    # 1️⃣ Explicit stock column (preferred), 2️⃣ fallback auto-detection
+    if request.stock_col and request.stock_col in df_raw.columns:
+        stock_col = request.stock_col
+    else:
+        stock_col = next(
+            (c for c in _STOCK_COL_CANDIDATES if c in df_raw.columns),
+            None
+        )
+    if stock_col is None:
+        raise _no_stock("No usable stock column detected")
+
+    # Latest non-null stock per key: pick the row at the max date
+    # per group instead of sorting the whole frame by date. Only the date
+    # and key columns are filtered; other columns are never copied.
+    stock_dates = pd.to_datetime(df_raw[request.date_col], errors="coerce")
+    usable = df_raw[stock_col].notna() & stock_dates.notna()
+    if not usable.any():
+        raise _no_stock(f"No stock values in column '{stock_col}'")
+
+    latest_idx = (
+        stock_dates[usable]
+        .groupby([df_raw["facility"][usable], df_raw["item"][usable]], sort=False, observed=True)
+        .idxmax()
+    )
+    return (
+        df_raw.loc[latest_idx, ["facility", "item", stock_col]]
+        .rename(columns={stock_col: "stock_on_hand"})
+        .reset_index(drop=True)
+    )
+
+
+# --------------------------------------------------
+# Response cache
+# --------------------------------------------------
+# Dashboard refreshes re-post the same payload within seconds. Finished
+# responses are kept briefly by payload hash, and a request arriving while
+# an identical one is still running waits for it instead of recomputing.
+# Only touched from the event loop, so no lock.
+_RESPONSE_TTL_S = 30
+_RESPONSE_CACHE = TTLCache(maxsize=128, ttl=_RESPONSE_TTL_S)
+_RESPONSE_PENDING = {}
+
+
+def _response_key(*parts) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"|")
+    return h.digest()
+
+
+def _replay(entry) -> Response:
+    body, media_type = entry
+    return Response(content=body, media_type=media_type)
+
+
+async def _cached_response(key: bytes, compute):
+    """
+    Serve `key` from _RESPONSE_CACHE, or join the identical request in
+    flight, or run `compute()` (an awaitable factory) and cache its body.
+    """
+    cached = _RESPONSE_CACHE.get(key)
+    if cached is None and key in _RESPONSE_PENDING:
+        cached = await asyncio.shield(_RESPONSE_PENDING[key])
+    if cached is not None:
+        return _replay(cached)
+
+    fut = asyncio.get_running_loop().create_future()
+    _RESPONSE_PENDING[key] = fut
+    try:
+        response = await compute()
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # retrieved here; waiters re-raise it
+        raise
+    else:
+        entry = (response.body, response.media_type)
+        _RESPONSE_CACHE[key] = entry
+        fut.set_result(entry)
+        return response
+    finally:
+        _RESPONSE_PENDING.pop(key, None)
+
+
+@router.post("/batch")
+async def batch_forecast(
+    request: BatchForecastRequest,
+    http_request: Request,
+    response_format: Literal["records", "columnar", "ndjson"] = Query("records", alias="format"),
+):
+    """
+    Multi-item, multi-facility batch forecast endpoint.
+    Fully self-contained: validates, preprocesses, forecasts, reorders.
+
+    `?format=columnar` returns each table as {"columns", "values"}
+    (see frame_payload) instead of a list of row dicts; `?format=ndjson`
+    streams one row per line (see ndjson_stream_response).
+
+    Send `Accept: application/vnd.apache.arrow.stream` to receive the
+    result frames as Arrow IPC instead of JSON records.
+
+    Identical payloads within _RESPONSE_TTL_S share one computation
+    (streamed NDJSON responses are always computed fresh).
+    """
+    accept = http_request.headers.get("accept")
+    if response_format == "ndjson":
+        return await _run_batch_forecast(request, accept, response_format)
+
+    key = _response_key(await http_request.body(), response_format, wants_arrow(accept))
+    return await _cached_response(
+        key, lambda: _run_batch_forecast(request, accept, response_format)
+    )
+
+
+def _arrow_payload_frame(body: bytes) -> pd.DataFrame:
+    """Arrow IPC stream body -> raw DataFrame (400 if it is not one)."""
+    try:
+        table = pa.ipc.open_stream(pa.BufferReader(body)).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Body is not an Arrow IPC stream: {e}"
+        )
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+@router.post("/batch_arrow")
+async def batch_forecast_arrow(
+    http_request: Request,
+    date_col: str,
+    demand_col: str,
+    horizon: int,
+    stock_col: Optional[str] = None,
+    return_forecast_detail: bool = True,
+    return_inventory_detail: bool = True,
+    max_detail_rows: int = 20000,
+    response_format: Literal["records", "columnar", "ndjson"] = Query("records", alias="format"),
+):
+    """
+    /batch with the history sent as an Arrow IPC stream body
+    (Content-Type: application/vnd.apache.arrow.stream) instead of JSON
+    rows; the remaining BatchForecastRequest fields are query parameters.
+
+    Client side:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        httpx.post(url, content=sink.getvalue().to_pybytes(), params={...})
+    """
+    request = BatchForecastRequest(
+        data=[],
+        date_col=date_col,
+        demand_col=demand_col,
+        horizon=horizon,
+        stock_col=stock_col,
+        return_forecast_detail=return_forecast_detail,
+        return_inventory_detail=return_inventory_detail,
+        max_detail_rows=max_detail_rows,
+    )
+    accept = http_request.headers.get("accept")
+    body = await http_request.body()
+
+    async def compute():
+        loop = asyncio.get_running_loop()
+        df_raw = await loop.run_in_executor(_POOL, _arrow_payload_frame, body)
+        return await _run_batch_forecast(request, accept, response_format, df_raw=df_raw)
+
+    if response_format == "ndjson":
+        return await compute()
+
+    key = _response_key(
+        body, http_request.url.query, response_format, wants_arrow(accept)
+    )
+    return await _cached_response(key, compute)
+
+
+async def _run_batch_forecast(
+    request: BatchForecastRequest, accept, response_format: str, df_raw=None
+):
+    """The /batch pipeline; `df_raw` replaces request.data when given."""
+    loop = asyncio.get_running_loop()
+
+    # --------------------------------------------------
+    # 1-2) Load payload, validate, normalize
+    # --------------------------------------------------
+    df_raw = await loop.run_in_executor(_POOL, _load_stage, request, df_raw)
+
+    # --------------------------------------------------
+    # 3) Preprocess (creates ds, y, day_of_week, month)
+    # --------------------------------------------------
+    df, digest = await loop.run_in_executor(
+        _POOL, _preprocess_stage, df_raw, request.date_col, request.demand_col
+    )
+    vol_key = (
+        None if digest is None
+        else ("volatility", digest, request.date_col, request.demand_col)
+    )
+
+    # --------------------------------------------------
+    # 4) Independent stages, run concurrently:
+    #    volatility, batch forecast, lead time, starting stock
+    # --------------------------------------------------
+    (
+        vol_df,
+        (batch_forecast_df, metrics_df),
+        lead_time_df,
+        inventory_df,
+    ) = await asyncio.gather(
+        loop.run_in_executor(_POOL, _volatility_stage, df, vol_key),
+        forecast_batcher.submit(
+            (df, request.horizon),
+            key=None if digest is None else (
+                "forecast", digest, request.date_col, request.demand_col, request.horizon
+            ),
+        ),
+        loop.run_in_executor(_POOL, _lead_time_stage, df_raw),
+        loop.run_in_executor(_POOL, _inventory_stage, df_raw, request),
+    )
+
+    # The forecast result may be shared with a coalesced identical request;
+    # the tail adds columns, so give this request its own frame
+    batch_forecast_df = batch_forecast_df.copy(deep=False)
+
+    return await loop.run_in_executor(
+        _POOL,
+        partial(
+            _plan_and_respond,
+            request=request,
+            accept=accept,
+            response_format=response_format,
+            df_raw=df_raw,
+            df=df,
+            vol_df=vol_df,
+            batch_forecast_df=batch_forecast_df,
+            metrics_df=metrics_df,
+            lead_time_df=lead_time_df,
+            inventory_df=inventory_df,
+        ),
+    )
+
+
+def _limit_rows(df: pd.DataFrame, n: int, by=None, largest=True) -> pd.DataFrame:
+    """
+    At most `n` rows of `df`: the top `n` by column `by` when given (kept
+    in their original order), else the first `n`.
+    """
+    if len(df) <= n:
+        return df
+    if by is None or by not in df.columns:
+        return df.iloc[:n]
+    col = df[by].reset_index(drop=True)
+    top = col.nlargest(n) if largest else col.nsmallest(n)
+    return df.iloc[np.sort(top.index.to_numpy())]
+
+
+def _plan_and_respond(
+    request: BatchForecastRequest,
+    accept,
+    response_format: str,
+    df_raw: pd.DataFrame,
+    df: pd.DataFrame,
+    vol_df: pd.DataFrame,
+    batch_forecast_df: pd.DataFrame,
+    metrics_df: pd.DataFrame,
+    lead_time_df: pd.DataFrame,
+    inventory_df: pd.DataFrame,
+):
+    """
+    Sequential tail of batch_forecast: reorder points, scenarios,
+    simulation, confidence and the response. Runs on _POOL.
+    """
+    reorder_agent = _reorder_agent()
 
     # --------------------------------------------------
     # 8) Merge lead-time into forecast (FIXED)
     # --------------------------------------------------
     if not lead_time_df.empty:
-        batch_forecast_df = batch_forecast_df.merge(
-            lead_time_df,
-            on=["facility", "item"],
-            how="left"
+        # One lead time per key; a duplicate would mean a broken aggregation
+        batch_forecast_df["lead_time_days"] = lookup_by_keys(
+            batch_forecast_df, lead_time_df, "lead_time_days", validate=True
         )
 
     # Guardrails
@@ -152,24 +707,43 @@ def batch_forecast(request: BatchForecastRequest):
             detail="lead_time_days missing after merge — cannot compute reorder points"
         )
 
-    missing_lt = int(batch_forecast_df["lead_time_days"].isna().sum())
     # ✅ Instead of failing all, we allow partial + compute reorder where possible
     # (much better UX)
     # If you want strict mode, change this to raise.
     # For now: keep going.
 
     # --------------------------------------------------
-    # 9) Reorder points
+    # 9) Reorder points + scenario analysis (one pass)
+    #    Baseline, Demand +30%, Lead Time +7d
     # --------------------------------------------------
+    scenario_agent = ScenarioAgent()
     try:
-        reorder_df = reorder_agent.compute_reorder_point(
-            forecast_df=batch_forecast_df,
+        scenario_df = reorder_agent.compute_reorder_point(
+            forecast_df=scenario_agent.build_scenarios(
+                batch_forecast_df,
+                surge_pct=0.30,
+                extra_days=7
+            ),
             demand_col="forecast",
             lead_time_col="lead_time_days",
+            group_cols=("scenario", "facility", "item"),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reorder computation failed: {str(e)}")
 
+    if scenario_df.empty:
+        reorder_df = scenario_df
+    else:
+        # scenario last, matching the per-scenario frames this replaced
+        scenario_df = scenario_df[
+            [c for c in scenario_df.columns if c != "scenario"] + ["scenario"]
+        ]
+        reorder_df = (
+            scenario_df.loc[scenario_df["scenario"] == "Baseline"]
+            .drop(columns="scenario")
+            .reset_index(drop=True)
+        )
+
     # --------------------------------------------------
     # 9.1) Explainable reorder drivers
     # --------------------------------------------------
@@ -178,87 +752,6 @@ def batch_forecast(request: BatchForecastRequest):
     reorder_explanations = explain_agent.explain_reorder_drivers(reorder_df)
     reorder_driver_scores = explain_agent.compute_driver_scores(reorder_df)
 
-    # --------------------------------------------------
-    # 9.2) Scenario analysis
-    # --------------------------------------------------
-    scenario_agent = ScenarioAgent()
-    scenario_results = []
-
-    # --- Baseline
-    baseline = reorder_df.copy()
-    baseline["scenario"] = "Baseline"
-    scenario_results.append(baseline)
-
-    # --- Demand surge (+30%)
-    surge_forecast = scenario_agent.run_demand_surge(
-        batch_forecast_df,
-        surge_pct=0.30
-    )
-    surge_reorder = reorder_agent.compute_reorder_point(
-        forecast_df=surge_forecast,
-        demand_col="forecast",
-        lead_time_col="lead_time_days",
-    )
-    surge_reorder["scenario"] = "Demand +30%"
-    scenario_results.append(surge_reorder)
-
-    # --- Lead time shock (+7 days)
-    lt_forecast = scenario_agent.run_lead_time_shock(
-        batch_forecast_df,
-        extra_days=7
-    )
-    lt_reorder = reorder_agent.compute_reorder_point(
-        forecast_df=lt_forecast,
-        demand_col="forecast",
-        lead_time_col="lead_time_days",
-    )
-    lt_reorder["scenario"] = "Lead Time +7d"
-    scenario_results.append(lt_reorder)
-
-    scenario_df = pd.concat(scenario_results, ignore_index=True)
-
-    # --------------------------------------------------
-    # 10) Build inventory_df (starting stock) for simulation
-    # --------------------------------------------------
-
-    inventory_df = pd.DataFrame(columns=["facility", "item", "stock_on_hand"])
-
-    # 1️⃣ Explicit stock column (preferred)
-    if request.stock_col and request.stock_col in df_raw.columns:
-        stock_col = request.stock_col
-
-    # 2️⃣ Fallback auto-detection
-    else:
-        possible_stock_cols = [
-            "stock_on_hand",
-            "current_stock",
-            "on_hand",
-            "stock"
-        ]
-        stock_col = next(
-            (c for c in possible_stock_cols if c in df_raw.columns),
-            None
-        )
-
-    if stock_col:
-        inventory_df = (
-            df_raw
-            .sort_values(request.date_col)
-            .groupby(["facility", "item"], as_index=False)
-            .agg({stock_col: "last"})
-            .rename(columns={stock_col: "stock_on_hand"})
-        )
-    if inventory_df.empty:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": "Inventory simulation skipped",
-                "reason": "No usable stock column detected",
-                "received_columns": df_raw.columns.tolist(),
-                "expected_columns": possible_stock_cols,
-                "request_stock_col": request.stock_col
-            }
-        )
     # --------------------------------------------------
     # 11) Inventory simulation
     # --------------------------------------------------
@@ -285,20 +778,19 @@ def batch_forecast(request: BatchForecastRequest):
     # 11.1) Merge volatility into inventory simulation
     # --------------------------------------------------
     if not sim_df.empty and not vol_df.empty:
-        for c in ["facility", "item"]:
-            sim_df[c] = sim_df[c].astype(str).str.strip().str.lower()
-            vol_df[c] = vol_df[c].astype(str).str.strip().str.lower()
-
-        sim_df = sim_df.merge(
-            vol_df[["facility", "item", "volatility_class"]],
-            on=["facility", "item"],
-            how="left"
+        sim_df["volatility_class"] = lookup_by_keys(
+            sim_df, vol_df, "volatility_class", validate=True
         )
     if not sim_df.empty:
         risk_agent = InventoryRiskAgent()
         sim_df = risk_agent.score(sim_df)    
         
-    if sim_df["volatility_class"].isna().all():
+    # No simulation (nothing to score) is not an error; a simulation whose
+    # volatility never got attached is
+    if not sim_df.empty and (
+        "volatility_class" not in sim_df.columns
+        or sim_df["volatility_class"].isna().to_numpy().all()
+    ):
         raise RuntimeError(
             "Volatility missing for all rows — risk scoring would be invalid"
         )
@@ -307,66 +799,43 @@ def batch_forecast(request: BatchForecastRequest):
     # --------------------------------------------------
     # 11.2) Confidence scoring & data quality guardrails
     # --------------------------------------------------
-    confidence_results = []
-
     dq_agent = DataQualityAgent()
     conf_agent = ConfidenceAgent()
 
-    # Group on PREPROCESSED df (has ds, y)
-    for (facility, item), g in df.groupby(["facility", "item"]):
-        # -----------------------------
-        # Data Quality
-        # -----------------------------
-        dq = dq_agent.assess(g)
-
-        # -----------------------------
-        # Volatility class
-        # -----------------------------
-        vol_match = vol_df.loc[
-            (vol_df["facility"] == facility) &
-            (vol_df["item"] == item),
-            "volatility_class"
-        ].values
-        volatility_class = vol_match[0] if len(vol_match) else "Unknown"
-
-        # -----------------------------
-        # Forecast performance (cache hit)
-        # -----------------------------
-        perf = metrics_df.loc[
-            (metrics_df["facility"] == facility) &
-            (metrics_df["item"] == item)
-        ]
-        forecast_cache_hit = (
-            bool(perf["cache_hit"].iloc[0])
-            if not perf.empty and "cache_hit" in perf.columns
-            else False
-        )
+    # One row per (facility, item) of the PREPROCESSED df (has ds, y)
+    conf_df = dq_agent.assess_batch(df, group_cols=("facility", "item"))
+    conf_df = conf_df.rename(columns={"score": "dq_score", "issues": "dq_issues"})
+    conf_keys = key_index(conf_df)
 
-        # -----------------------------
-        # Lead time confidence
-        # -----------------------------
-        lt_rows = batch_forecast_df.loc[
-            (batch_forecast_df["facility"] == facility) &
-            (batch_forecast_df["item"] == item),
-            "lead_time_days"
-        ]
-        lead_time_missing = lt_rows.isna().any()
-
-        # -----------------------------
-        # Confidence score
-        # -----------------------------
-        confidence = conf_agent.score(
-            data_quality=dq,
-            volatility_class=volatility_class,
-            lead_time_missing=lead_time_missing,
-            forecast_cache_hit=forecast_cache_hit
+    conf_df["volatility_class"] = lookup_by_keys(
+        conf_df, vol_df, "volatility_class", index=conf_keys
+    ).fillna("Unknown")
+
+    if "cache_hit" in metrics_df.columns and not metrics_df.empty:
+        conf_df["forecast_cache_hit"] = (
+            lookup_by_keys(conf_df, metrics_df, "cache_hit", index=conf_keys)
+            .eq(True)
         )
+    else:
+        conf_df["forecast_cache_hit"] = False
+
+    # Any missing lead time in a key's forecast rows; keys without rows count as observed
+    lt_missing = (
+        batch_forecast_df["lead_time_days"].isna()
+        .groupby([batch_forecast_df["facility"], batch_forecast_df["item"]], observed=True)
+        .any()
+        .rename("lead_time_missing")
+        .reset_index()
+    )
+    conf_df["lead_time_missing"] = (
+        lookup_by_keys(conf_df, lt_missing, "lead_time_missing", index=conf_keys)
+        .eq(True)
+    )
 
-        confidence_results.append({
-            "facility": facility,
-            "item": item,
-            **confidence
-        })
+    confidence_df = pd.concat(
+        [conf_df[["facility", "item"]], conf_agent.score_batch(conf_df)],
+        axis=1,
+    )
 
     # --------------------------------------------------
     # 11.3) Rollups (ALWAYS returned, lightweight)
@@ -376,7 +845,7 @@ def batch_forecast(request: BatchForecastRequest):
 
     if not sim_df.empty and "stock_on_hand" in sim_df.columns:
         inventory_worst = (
-            sim_df.groupby(["facility", "item"], as_index=False)
+            sim_df.groupby(["facility", "item"], as_index=False, observed=True)
             .agg(
                 min_stock=("stock_on_hand", "min"),
                 min_days_cover=("days_of_cover", "min"),
@@ -385,64 +854,159 @@ def batch_forecast(request: BatchForecastRequest):
         )
 
     if not sim_df.empty and "inventory_risk" in sim_df.columns:
-        risk_rollup = (
-            sim_df.assign(
-                risk_level=sim_df["inventory_risk"]
-                .astype(str).str.strip().str.upper()
-                .map({"LOW": 1, "MEDIUM": 2, "HIGH": 3})
-            )
-            .groupby(["facility", "item"], as_index=False)
-            .agg(max_risk=("risk_level", "max"))
-        )
-        risk_rollup["inventory_risk"] = (
-            risk_rollup["max_risk"]
-            .map({1: "LOW", 2: "MEDIUM", 3: "HIGH"})
-            .fillna("UNKNOWN")
+        # Ordered categorical: the per-key max is the worst level, and
+        # codes give the numeric level without mapping strings
+        worst = (
+            sim_df["inventory_risk"].astype(_RISK_LEVEL)
+            .groupby([sim_df["facility"], sim_df["item"]], observed=True)
+            .max()
         )
+        codes = pd.Series(worst.cat.codes.to_numpy())
+        risk_rollup = worst.index.to_frame(index=False)
+        risk_rollup["max_risk"] = (codes + 1).where(codes >= 0)
+        risk_rollup["inventory_risk"] = worst.astype(object).fillna("UNKNOWN").to_numpy()
 
 
     # --------------------------------------------------
     # RESPONSE SIZE CONTROL (SUMMARY MODE)
     # --------------------------------------------------
 
-    # Default outputs
-    forecast_out = batch_forecast_df
-    inventory_out = sim_df
-    scenario_out = scenario_df
+    # Applied before any conversion, so dropped rows are never serialized
+    max_rows = max(0, int(request.max_detail_rows))
+
+    if not request.return_forecast_detail:
+        forecast_out = batch_forecast_df.iloc[0:0]
+    else:
+        # Highest-demand rows first when capped
+        forecast_out = _limit_rows(batch_forecast_df, max_rows, by="forecast")
+
+    if not request.return_inventory_detail:
+        inventory_out = sim_df.iloc[0:0]
+    else:
+        # Least days of cover (most at risk) first when capped
+        inventory_out = _limit_rows(sim_df, max_rows, by="days_of_cover", largest=False)
+
+    scenario_out = _limit_rows(scenario_df, max_rows)
+    performance_out = _limit_rows(metrics_df, max_rows)
+    driver_scores_out = _limit_rows(reorder_driver_scores, max_rows)
 
 
     # --------------------------------------------------
     # 12) Response
     # --------------------------------------------------
-    return {
-        "status": "success",
-        "meta": {
-            "horizon_days": request.horizon,
-            "records_received": len(df_raw),
-            "forecast_rows": len(forecast_out),
-            "inventory_rows": len(inventory_out),
-            "scenario_rows": len(scenario_out),
-        
-            "reorder_rows": len(reorder_df),
-            "cache_hit_rate": round(float(metrics_df["cache_hit"].mean()), 2) if "cache_hit" in metrics_df.columns and not metrics_df.empty else None,
-            "avg_runtime_sec": round(float(metrics_df["runtime_sec"].mean()), 2) if "runtime_sec" in metrics_df.columns and not metrics_df.empty else None,
-            "detail_mode": {
-                "forecast": bool(request.return_forecast_detail),
-                "inventory": bool(request.return_inventory_detail),
-                "max_detail_rows": int(request.max_detail_rows),
-            },
+    meta = {
+        "horizon_days": request.horizon,
+        "records_received": len(df_raw),
+        "forecast_rows": len(forecast_out),
+        "inventory_rows": len(inventory_out),
+        "scenario_rows": len(scenario_out),
+
+        "reorder_rows": len(reorder_df),
+        "cache_hit_rate": round(float(metrics_df["cache_hit"].mean()), 2) if "cache_hit" in metrics_df.columns and not metrics_df.empty else None,
+        "avg_runtime_sec": round(float(metrics_df["runtime_sec"].mean()), 2) if "runtime_sec" in metrics_df.columns and not metrics_df.empty else None,
+        "detail_mode": {
+            "forecast": bool(request.return_forecast_detail),
+            "inventory": bool(request.return_inventory_detail),
+            "max_detail_rows": int(request.max_detail_rows),
         },
-        # ✅ use the controlled outputs
-        "forecast": forecast_out.to_dict(orient="records"),
-        "inventory": inventory_out.to_dict(orient="records"),
-        "scenarios": scenario_out.to_dict(orient="records"),
+    }
+
+    if wants_arrow(accept):
+        return arrow_stream_response(
+            frames={
+                "forecast": forecast_out,
+                "inventory": inventory_out,
+                "scenarios": scenario_out,
+                "reorder": reorder_df,
+                "performance": performance_out,
+                "volatility": vol_df,
+                "confidence": confidence_df,
+                "reorder_explanations": pd.DataFrame({"explanation": reorder_explanations}),
+                "reorder_driver_scores": driver_scores_out,
+                "inventory_worst": inventory_worst,
+                "risk_rollup": risk_rollup,
+            },
+            meta=meta,
+        )
+
+    if response_format == "ndjson":
+        return ndjson_stream_response(
+            header={"status": "success", "meta": meta},
+            sections={
+                "forecast": forecast_out,
+                "inventory": inventory_out,
+                "scenarios": scenario_out,
+                "reorder": reorder_df,
+                "performance": performance_out,
+                "volatility": vol_df,
+                "confidence": confidence_df,
+                "reorder_explanations": reorder_explanations,
+                "reorder_driver_scores": driver_scores_out,
+                "inventory_worst": inventory_worst,
+                "risk_rollup": risk_rollup,
+            },
+        )
+
+    if response_format == "columnar":
+        return ORJSONResponse({
+            "status": "success",
+            "meta": meta,
+            "forecast": frame_payload(forecast_out),
+            "inventory": frame_payload(inventory_out),
+            "scenarios": frame_payload(scenario_out),
+            "reorder": frame_payload(reorder_df),
+            "performance": frame_payload(performance_out),
+            "volatility": frame_payload(vol_df),
+            "confidence": frame_payload(confidence_df),
+            "reorder_explanations": reorder_explanations,
+            "reorder_driver_scores": frame_payload(driver_scores_out),
+            "inventory_worst": frame_payload(inventory_worst),
+            "risk_rollup": frame_payload(risk_rollup),
+        })
+
+    # ✅ use the controlled outputs; convert the big frames concurrently
+    (
+        forecast_rec,
+        inventory_rec,
+        scenario_rec,
+        reorder_rec,
+        performance_rec,
+        volatility_rec,
+        confidence_rec,
+        driver_rec,
+        inventory_worst_rec,
+        risk_rollup_rec,
+    ) = _RECORDS_POOL.map(
+        _to_records,
+        [
+            forecast_out,
+            inventory_out,
+            scenario_out,
+            reorder_df,
+            performance_out,
+            vol_df,
+            confidence_df,
+            driver_scores_out,
+            inventory_worst,
+            risk_rollup,
+        ],
+    )
+
+    return ORJSONResponse({
+        "status": "success",
+        "meta": meta,
+        "forecast": forecast_rec,
+        "inventory": inventory_rec,
+        "scenarios": scenario_rec,
 
         # Always returned
 
-        "reorder": reorder_df.to_dict(orient="records"),
-        "performance": metrics_df.to_dict(orient="records"),
-        "volatility": vol_df.to_dict(orient="records"),
-        "confidence": confidence_results,
+        "reorder": reorder_rec,
+        "performance": performance_rec,
+        "volatility": volatility_rec,
+        "confidence": confidence_rec,
         "reorder_explanations": reorder_explanations,
-        "reorder_driver_scores": reorder_driver_scores.to_dict(orient="records"),
-    }
+        "reorder_driver_scores": driver_rec,
+        "inventory_worst": inventory_worst_rec,
+        "risk_rollup": risk_rollup_rec,
+    })
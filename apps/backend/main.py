@@ -1,12 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from apps.backend.api.forecast import router as forecast_router
+from apps.backend.api.forecast import (
+    forecast_batcher,
+    router as forecast_router,
+    start_forecast_pool,
+    stop_forecast_pool,
+)
 from apps.backend.api.reorder import router as reorder_router
 from apps.backend.api.simulate import router as simulate_router
 from apps.backend.api.executive import router as executive_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_forecast_pool()
+    await forecast_batcher.start()
+    yield
+    await forecast_batcher.stop()
+    stop_forecast_pool()
+
+
 app = FastAPI(
     title="Health AI Ecosystem API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 app.include_router(forecast_router, prefix="/forecast")
@@ -0,0 +1,160 @@
+# apps/backend/responses.py
+
+from decimal import Decimal
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _orjson_default(obj):
+    """
+    Fallback encoder for values orjson does not serialize natively
+    (pandas Timestamp / NaT / NA, Decimal, exotic numpy scalars).
+    """
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Returning this directly from an endpoint skips FastAPI's
+    jsonable_encoder pass; numpy scalars/arrays are encoded natively.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+def _column_values(s: pd.Series):
+    """
+    One column as something orjson can encode without per-cell boxing.
+
+    Plain numeric/bool and NaT-free naive datetime columns go out as numpy
+    arrays (OPT_SERIALIZE_NUMPY). Everything else (categoricals, strings,
+    nullable dtypes, datetimes with NaT) becomes a list with None for
+    missing values.
+    """
+    if isinstance(s.dtype, np.dtype):
+        if s.dtype.kind in "biuf":
+            return np.ascontiguousarray(s.to_numpy())
+        # orjson writes NaT inside datetime64 arrays as a 1677 date
+        if s.dtype.kind == "M" and not s.isna().any():
+            return np.ascontiguousarray(s.to_numpy())
+    return s.astype(object).where(s.notna(), None).tolist()
+
+
+def frame_payload(df: pd.DataFrame) -> dict:
+    """
+    Columnar JSON form of a DataFrame: {"columns": [...], "values": [...]}
+    where values[i] holds every value of columns[i].
+
+    Rebuild client side with pd.DataFrame(dict(zip(p["columns"], p["values"]))).
+    """
+    return {
+        "columns": [str(c) for c in df.columns],
+        "values": [_column_values(df.iloc[:, i]) for i in range(df.shape[1])],
+    }
+
+
+def wants_arrow(accept_header) -> bool:
+    """True when the client opted into the Arrow IPC response format."""
+    return ARROW_STREAM_MEDIA_TYPE in (accept_header or "")
+
+
+def _frame_to_ipc(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_stream_response(frames: dict, meta: dict) -> Response:
+    """
+    Bundle several DataFrames into one Arrow IPC stream.
+
+    Frames have different schemas, so the outer stream has one row per
+    frame: (frame name, Arrow IPC stream bytes of that frame).
+    `meta` travels as JSON in the outer schema metadata.
+
+    Client side:
+        outer = pa.ipc.open_stream(body).read_all()
+        frames = {
+            name: pa.ipc.open_stream(blob).read_pandas()
+            for name, blob in zip(outer["frame"].to_pylist(), outer["ipc"].to_pylist())
+        }
+    """
+    names = list(frames)
+    outer = pa.table(
+        {
+            "frame": pa.array(names, type=pa.string()),
+            "ipc": pa.array([_frame_to_ipc(frames[n]) for n in names], type=pa.binary()),
+        }
+    ).replace_schema_metadata({"meta": orjson.dumps(meta, default=_orjson_default)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, outer.schema) as writer:
+        writer.write_table(outer)
+
+    return Response(
+        content=sink.getvalue().to_pybytes(),
+        media_type=ARROW_STREAM_MEDIA_TYPE,
+    )
+
+
+def _dumps_line(obj) -> bytes:
+    return orjson.dumps(
+        obj,
+        default=_orjson_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE,
+    )
+
+
+def _ndjson_lines(header: dict, sections: dict, chunk_rows: int):
+    yield _dumps_line(header)
+    for name, rows in sections.items():
+        for start in range(0, len(rows), chunk_rows):
+            if isinstance(rows, pd.DataFrame):
+                chunk = rows.iloc[start:start + chunk_rows].to_dict(orient="records")
+            else:
+                chunk = rows[start:start + chunk_rows]
+            yield b"".join(_dumps_line({"section": name, "record": r}) for r in chunk)
+
+
+def ndjson_stream_response(header: dict, sections: dict, chunk_rows: int = 5000) -> StreamingResponse:
+    """
+    Stream a response as newline-delimited JSON.
+
+    The first line is `header`; then one line per row of every section
+    (a DataFrame or a plain list), in order:
+        {"section": "<name>", "record": {...}}
+    Rows are converted and encoded `chunk_rows` at a time while the body
+    is sent, so the full records payload is never held in memory.
+    """
+    return StreamingResponse(
+        _ndjson_lines(header, sections, chunk_rows),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -0,0 +1,34 @@
+# apps/backend/routing.py
+
+from typing import Callable
+
+import orjson
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+
+class ORJSONRequest(Request):
+    """
+    Request whose JSON body is decoded with orjson.
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so FastAPI
+    still turns malformed bodies into a 422.
+    """
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    """Route class that hands endpoints an ORJSONRequest."""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request) -> Response:
+            request = ORJSONRequest(request.scope, request.receive)
+            return await original_route_handler(request)
+
+        return orjson_route_handler
@@ -0,0 +1,146 @@
+# apps/backend/utils/frames.py
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def records_to_frame(records: list) -> pd.DataFrame:
+    """
+    Build a DataFrame from a JSON list-of-dicts payload via Arrow.
+
+    Arrow converts the rows in C++ instead of pandas' per-row dict walk.
+    It infers columns from the first row and rejects mixed-type columns,
+    so ragged or mixed payloads fall back to pd.DataFrame.
+    """
+    if not records or not all(isinstance(r, dict) for r in records):
+        return pd.DataFrame(records)
+
+    keys = records[0].keys()
+    if any(r.keys() != keys for r in records):
+        return pd.DataFrame(records)
+
+    try:
+        return pa.Table.from_pylist(records).to_pandas()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pd.DataFrame(records)
+
+
+def downcast_numeric(df: pd.DataFrame, skip=()) -> pd.DataFrame:
+    """
+    Shrink 64-bit numeric columns in place where it loses nothing.
+
+    float64 -> float32 only when every value round-trips exactly;
+    int64 -> int32 when the range fits (not smaller, so downstream
+    integer arithmetic keeps headroom).
+    """
+    for c in df.columns:
+        if c in skip:
+            continue
+        s = df[c]
+        if s.dtype == np.float64:
+            f32 = s.to_numpy(dtype=np.float32)
+            same = (f32 == s.to_numpy()) | (np.isnan(f32) & s.isna().to_numpy())
+            if same.all():
+                df[c] = f32
+        elif s.dtype == np.int64:
+            info = np.iinfo(np.int32)
+            if s.empty or (s.min() >= info.min and s.max() <= info.max):
+                df[c] = s.astype(np.int32)
+    return df
+
+
+def _normalized_categorical(s: pd.Series) -> pd.Categorical:
+    """
+    Strip/lowercase a key column once per distinct value.
+
+    The string work runs on the categorical's categories (tiny), not on
+    every row. Categories that collapse onto the same key after
+    normalization are merged, and kept sorted so groupby order matches
+    plain string keys.
+    """
+    cat = pd.Categorical(s)
+    new_cats = cat.categories.astype(str).str.strip().str.lower()
+    cat_codes, uniques = pd.factorize(new_cats, sort=True)
+    codes = np.where(cat.codes >= 0, cat_codes[cat.codes], -1)
+    return pd.Categorical.from_codes(codes, categories=uniques)
+
+
+def _is_normalized_categorical(s: pd.Series) -> bool:
+    """Categorical whose categories are already stripped, lowercased and sorted."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return False
+    cats = s.cat.categories
+    return cats.is_monotonic_increasing and cats.astype(str).str.strip().str.lower().equals(cats)
+
+
+def _keys_already_normalized(df: pd.DataFrame, cols) -> bool:
+    """True when `df` carries the normalization marker for all `cols`."""
+    done = df.attrs.get("_keys_normalized", ())
+    return all(
+        c in done and isinstance(df[c].dtype, pd.CategoricalDtype)
+        for c in cols
+        if c in df.columns
+    )
+
+
+def normalize_keys(df: pd.DataFrame, cols=("facility", "item"), inplace=True) -> pd.DataFrame:
+    """
+    Normalize merge keys consistently across all tables (categorical dtype).
+
+    Only the key columns are replaced (on `df` itself unless
+    inplace=False); columns that are already normalized categoricals are
+    left alone. The result is marked in `df.attrs["_keys_normalized"]`,
+    so repeat calls on the same (or attrs-propagated) frame are a no-op.
+    """
+    if _keys_already_normalized(df, cols):
+        return df
+
+    if not inplace:
+        df = df.copy()
+    for c in cols:
+        if c in df.columns and not _is_normalized_categorical(df[c]):
+            df[c] = _normalized_categorical(df[c])
+
+    done = set(df.attrs.get("_keys_normalized", ()))
+    df.attrs["_keys_normalized"] = tuple(sorted(done | {c for c in cols if c in df.columns}))
+    return df
+
+
+def key_index(df: pd.DataFrame, keys=("facility", "item")) -> pd.MultiIndex:
+    """Row-aligned MultiIndex over the key columns of `df`."""
+    return pd.MultiIndex.from_frame(df[list(keys)])
+
+
+def lookup_by_keys(
+    df: pd.DataFrame,
+    table: pd.DataFrame,
+    value_col: str,
+    keys=("facility", "item"),
+    index: pd.MultiIndex = None,
+    validate: bool = False,
+) -> pd.Series:
+    """
+    Left-join one column of a per-key table onto `df` as an index lookup.
+
+    Equivalent to `df.merge(table[[*keys, value_col]], how="left")[value_col]`
+    for a table with unique keys, without building the merged frame.
+    Duplicate keys in `table` keep their last value, or raise
+    pd.errors.MergeError with validate=True (merge's validate="many_to_one").
+
+    Pass `index=key_index(df)` when looking up several tables against the
+    same frame so its keys are hashed once.
+    """
+    keys = list(keys)
+    if index is None:
+        index = key_index(df, keys)
+    if validate:
+        if table.duplicated(keys).any():
+            raise pd.errors.MergeError(
+                f"Lookup keys {keys} are not unique in the right table"
+            )
+    else:
+        table = table.drop_duplicates(keys, keep="last")
+    lookup = table.set_index(keys)[value_col]
+    values = lookup.reindex(index).to_numpy()
+    return pd.Series(values, index=df.index, name=value_col)
@@ -1,6 +1,16 @@
 # src/agentic_ai/confidence_agent.py
 
+import numpy as np
+import pandas as pd
+
 class ConfidenceAgent:
+    VOL_MAP = {
+        "Low": 25,
+        "Medium": 15,
+        "High": 5,
+        "Unknown": 10
+    }
+
     def score(
         self,
         data_quality: dict,
@@ -20,13 +30,7 @@ class ConfidenceAgent:
             drivers.append("High data completeness")
 
         # --- Demand Stability (25)
-        vol_map = {
-            "Low": 25,
-            "Medium": 15,
-            "High": 5,
-            "Unknown": 10
-        }
-        vol_score = vol_map.get(volatility_class, 10)
+        vol_score = self.VOL_MAP.get(volatility_class, 10)
         if vol_score >= 20:
             drivers.append("Stable demand pattern")
         else:
@@ -62,3 +66,59 @@ class ConfidenceAgent:
             "confidence_drivers": drivers,
             "confidence_warnings": warnings
         }
+
+    def score_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        score() over many rows at once.
+
+        `df` holds one row per key with columns dq_score, dq_issues,
+        volatility_class, lead_time_missing and forecast_cache_hit.
+        Returns confidence_score, confidence_band, confidence_drivers and
+        confidence_warnings aligned to df.index.
+        """
+        dq_score = df["dq_score"].to_numpy(dtype=float) * 0.30
+        vol_score = np.array(
+            [self.VOL_MAP.get(v, 10) for v in df["volatility_class"]],
+            dtype=float,
+        )
+        cache_hit = df["forecast_cache_hit"].to_numpy(dtype=bool)
+        lt_missing = df["lead_time_missing"].to_numpy(dtype=bool)
+
+        fc_score = np.where(cache_hit, 25, 15)
+        lt_score = np.where(lt_missing, 10, 20)
+
+        # np.rint rounds half to even, like round() in score()
+        total = np.rint(dq_score + vol_score + fc_score + lt_score).astype(int)
+        band = np.select([total >= 75, total >= 50], ["HIGH", "MEDIUM"], "LOW")
+
+        stable = vol_score >= 20
+        drivers = []
+        warnings = []
+        for issues, st, hit, lt in zip(df["dq_issues"], stable, cache_hit, lt_missing):
+            d = [] if issues else ["High data completeness"]
+            w = list(issues)
+            if st:
+                d.append("Stable demand pattern")
+            else:
+                w.append("Demand volatility reduces confidence")
+            d.append(
+                "Forecast model reused (cached)"
+                if hit else
+                "Forecast model freshly trained"
+            )
+            if lt:
+                w.append("Lead time inferred (not observed)")
+            else:
+                d.append("Observed lead time available")
+            drivers.append(d)
+            warnings.append(w)
+
+        return pd.DataFrame(
+            {
+                "confidence_score": total,
+                "confidence_band": band,
+                "confidence_drivers": drivers,
+                "confidence_warnings": warnings,
+            },
+            index=df.index,
+        )
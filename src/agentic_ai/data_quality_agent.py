@@ -33,3 +33,43 @@ class DataQualityAgent:
             "issues": issues,
             "history_days": history_days
         }
+
+    def assess_batch(self, df: pd.DataFrame, group_cols=("facility", "item")) -> pd.DataFrame:
+        """
+        assess() for every group in one groupby pass.
+
+        Returns one row per group: group_cols, score, issues, history_days.
+        """
+        group_cols = list(group_cols)
+        stats = (
+            df.assign(_y_na=df["y"].isna(), _y_nonpos=df["y"] <= 0)
+            .groupby(group_cols, observed=True)
+            .agg(
+                history_days=("ds", "nunique"),
+                nan_frac=("_y_na", "mean"),
+                nonpositive=("_y_nonpos", "any"),
+            )
+        )
+
+        short = stats["history_days"] < 30
+        missing = stats["nan_frac"] > 0.05
+        nonpositive = stats["nonpositive"].astype(bool)
+
+        score = 100 - 30 * short - 15 * missing - 10 * nonpositive
+
+        issues = [
+            [
+                msg for flag, msg in (
+                    (s, "Insufficient historical data (<30 days)"),
+                    (m, "Missing demand values detected"),
+                    (n, "Zero or negative demand values detected"),
+                ) if flag
+            ]
+            for s, m, n in zip(short, missing, nonpositive)
+        ]
+
+        out = stats.reset_index()[group_cols]
+        out["score"] = score.clip(lower=0).to_numpy()
+        out["issues"] = issues
+        out["history_days"] = stats["history_days"].to_numpy()
+        return out
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -16,38 +17,37 @@ class ExplainableReorderAgent:
         - reorder_point
         """
 
-        explanations = []
-
         # Benchmarks for relative comparison
         demand_med = reorder_df["avg_daily_demand"].median()
         lead_time_med = reorder_df["lead_time_days"].median()
         safety_med = reorder_df["safety_stock"].median()
 
-        for _, row in reorder_df.iterrows():
-            drivers = []
-
-            if row["lead_time_days"] > lead_time_med:
-                drivers.append("longer-than-average lead time")
-
-            if row["avg_daily_demand"] > demand_med:
-                drivers.append("higher-than-average demand")
-
-            if row["safety_stock"] > safety_med:
-                drivers.append("high demand variability (safety stock)")
-
-            if not drivers:
-                drivers.append("stable demand and lead time")
-
-            explanation = (
-                f"**{row['item']} @ {row['facility']}** — "
-                f"Reorder point is elevated due to "
-                + ", ".join(drivers)
-                + "."
-            )
-
-            explanations.append(explanation)
+        m_lt = reorder_df["lead_time_days"].to_numpy() > lead_time_med
+        m_d = reorder_df["avg_daily_demand"].to_numpy() > demand_med
+        m_s = reorder_df["safety_stock"].to_numpy() > safety_med
+
+        drivers = pd.Series(
+            np.char.add(
+                np.char.add(
+                    np.where(m_lt, "longer-than-average lead time, ", ""),
+                    np.where(m_d, "higher-than-average demand, ", ""),
+                ),
+                np.where(m_s, "high demand variability (safety stock), ", ""),
+            ),
+            index=reorder_df.index,
+            dtype=object,
+        ).str[:-2]
+        drivers[~(m_lt | m_d | m_s)] = "stable demand and lead time"
+
+        explanations = (
+            "**" + reorder_df["item"].astype(str)
+            + " @ " + reorder_df["facility"].astype(str)
+            + "** — Reorder point is elevated due to "
+            + drivers
+            + "."
+        )
 
-        return explanations
+        return explanations.tolist()
 
     def compute_driver_scores(self, reorder_df):
         """
@@ -55,26 +55,22 @@ class ExplainableReorderAgent:
         for explainability dashboards.
         """
 
-        df = reorder_df.copy()
-
-        df["demand_score"] = (
-            df["avg_daily_demand"] / df["avg_daily_demand"].max()
-        )
-
-        df["lead_time_score"] = (
-            df["lead_time_days"] / df["lead_time_days"].max()
+        cols = ["avg_daily_demand", "lead_time_days", "safety_stock"]
+
+        # One copy of the three columns, normalized in place; NaN is
+        # skipped in the max like Series.max()
+        arr = reorder_df[cols].to_numpy(dtype=np.float64, copy=True)
+        maxes = np.fmax.reduce(arr, axis=0, initial=-np.inf)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(arr, maxes, out=arr)
+
+        return pd.DataFrame(
+            {
+                "facility": reorder_df["facility"].values,
+                "item": reorder_df["item"].values,
+                "demand_score": arr[:, 0],
+                "lead_time_score": arr[:, 1],
+                "variability_score": arr[:, 2],
+            },
+            index=reorder_df.index,
         )
-
-        df["variability_score"] = (
-            df["safety_stock"] / df["safety_stock"].max()
-        )
-
-        return df[
-            [
-                "facility",
-                "item",
-                "demand_score",
-                "lead_time_score",
-                "variability_score"
-            ]
-        ]
\ No newline at end of file
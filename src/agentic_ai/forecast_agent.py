@@ -16,21 +16,116 @@ from src.ai_core.model_cache import (
     save_cached_model
 )
 import re
+import time
 from pathlib import Path
+from functools import partial
+
+# Model inputs: calendar features for the per-group batch models, plus the
+# last known demand/stock for the single-model paths
+_FEATURE_COLS = ("day_of_week", "month")
+_FC_DEMAND = ("y", "stock_on_hand", "day_of_week", "month")
+
+
+def _safe_name(text: str) -> str:
+    """
+    Sanitize text for filesystem-safe cache keys.
+    """
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", str(text).lower())
+
+
+def _forecast_group(keys, g, periods, cache_dir, force_retrain, feature_cols, n_jobs=None):
+    """
+    Load or train the model for one group and forecast `periods` days.
+
+    Module level (not a closure) so it can run in worker processes.
+    """
+    facility, item = keys["facility"], keys["item"]
+    start = time.perf_counter()
+    model_name = "rf_demand"
+    cache_hit = False
+
+    safe_facility = _safe_name(facility)
+    safe_item = _safe_name(item)
+
+    model = None
+
+    if not force_retrain:
+        try:
+            model, _ = load_cached_model(
+                cache_dir,
+                safe_facility,
+                safe_item,
+                model_name
+            )
+            cache_hit = model is not None
+        except Exception:
+            model = None
+            cache_hit = False
+
+    if model is None:
+        model, _ = train_random_forest(
+            df=g,
+            feature_cols=feature_cols,
+            target_col="y",
+            n_jobs=n_jobs
+        )
+        save_cached_model(
+            model,
+            cache_dir,
+            safe_facility,
+            safe_item,
+            model_name
+        )
+    future_df = forecast_future_demand(
+        model=model,
+        df_history=g,
+        feature_cols=feature_cols,
+        periods=periods
+    )
+    for c, v in keys.items():
+        # Keep categorical keys categorical so pd.concat below preserves them
+        dtype = g[c].dtype
+        future_df[c] = pd.Series(
+            v,
+            index=future_df.index,
+            dtype=dtype if isinstance(dtype, pd.CategoricalDtype) else None,
+        )
+
+    duration = round(time.perf_counter() - start, 3)
+
+    metric = {
+        **keys,
+        "cache_hit": cache_hit,
+        "runtime_sec": duration
+    }
+    return future_df, metric
+
+
+def _forecast_chunk(chunk, **kwargs):
+    return [_forecast_group(keys, g, **kwargs) for keys, g in chunk]
+
+
+def warm_forecast_worker():
+    """ProcessPoolExecutor initializer: pay the model-stack imports up front."""
+    import sklearn.ensemble  # noqa: F401
+
 
 class ForecastAgent:
     """
     Agent responsible for training forecasting-related models.
     """
+    # Below this many groups a pool costs more than it saves
+    _PARALLEL_MIN_GROUPS = 3
+    # Shorter series are skipped (too few rows to split and fit)
+    _MIN_SERIES_ROWS = 5
+
     def _safe_name(self, text: str) -> str:
         """
         Sanitize text for filesystem-safe cache keys.
         """
-        return re.sub(r"[^a-zA-Z0-9_-]", "_", str(text).lower())
+        return _safe_name(text)
 
     def train_demand_model(self, df, feature_cols):
-        from src.ai_core.model_training import train_random_forest
-
         model, metrics = train_random_forest(
             df=df,
             feature_cols=feature_cols,
@@ -56,12 +151,7 @@ class ForecastAgent:
             target_col="demand"
         )
 
-        feature_cols = [
-            "y",
-            "stock_on_hand",
-            "day_of_week",
-            "month"
-        ]
+        feature_cols = list(_FC_DEMAND)
 
         # Train lead-time RF model
         model, metrics = train_random_forest(
@@ -90,12 +180,7 @@ class ForecastAgent:
         df_processed,
         periods=30
     ):
-        feature_cols = [
-            "y",
-            "stock_on_hand",
-            "day_of_week",
-            "month"
-        ]
+        feature_cols = list(_FC_DEMAND)
 
         forecast_df = forecast_future_demand(
             model=model,
@@ -115,31 +200,47 @@ class ForecastAgent:
         cache_dir="models/cache",
         force_retrain=False,
         parallel=True,
-        max_workers=4
+        max_workers=4,
+        batch_size=1,
+        executor=None,
+        group_cols=("facility", "item")
     ):
-    
-        from src.ai_core.model_training import train_random_forest
-        from src.ai_core.future_forecast import forecast_future_demand
-        from src.ai_core.model_cache import load_cached_model, save_cached_model
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        import pandas as pd
-        import time
-        
+        """
+        Train/load one model per (facility, item) and forecast `periods` days.
+
+        With parallel=True, groups run on `executor` when given (a shared,
+        long-lived thread or process pool owned by the caller); otherwise
+        on a pool of up to `max_workers` threads created for this call.
+        Fewer than _PARALLEL_MIN_GROUPS groups always run serially.
+
+        `group_cols` must include facility and item; extra leading columns
+        (e.g. a request id when several payloads are batched together)
+        split the series further and are carried into both outputs.
+        """
         cache_path = Path(cache_dir)
         cache_path.mkdir(parents=True, exist_ok=True)
 
-        required_cols = {"facility", "item", "ds", "y", "day_of_week", "month"}
+        group_cols = list(group_cols)
+        required_cols = {"facility", "item", "ds", "y", "day_of_week", "month", *group_cols}
         missing = required_cols - set(df.columns)
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
 
-        feature_cols = ["day_of_week", "month"]
+        feature_cols = list(_FEATURE_COLS)
+
+        # Only what the fit/forecast reads, so group slices stay small
+        # (they are pickled when `executor` is a process pool)
+        keep = [*group_cols, "ds", "y", *feature_cols, "stock_on_hand"]
+        df = df[[c for c in dict.fromkeys(keep) if c in df.columns]]
 
-        groups = []
-        for (facility, item), g in df.groupby(["facility", "item"]):
-            g = g.sort_values("ds")
-            if len(g) >= 5:
-                groups.append((facility, item, g))
+        # Drop short series up front so their group frames are never built
+        sizes = df.groupby(group_cols, observed=True, sort=False)["y"].transform("size")
+        df = df[sizes.to_numpy() >= self._MIN_SERIES_ROWS]
+
+        groups = [
+            (dict(zip(group_cols, key)), g.sort_values("ds"))
+            for key, g in df.groupby(group_cols, observed=True)
+        ]
 
         if not groups:
             raise ValueError("No valid facility–item combinations")
@@ -147,75 +248,40 @@ class ForecastAgent:
         metrics = []
         results = []
 
-        def _worker(facility, item, g):
-            start = time.time()
-            model_name = "rf_demand"
-            cache_hit = False
-
-            safe_facility = self._safe_name(facility)
-            safe_item = self._safe_name(item)
+        _run_chunk = partial(
+            _forecast_chunk,
+            periods=periods,
+            cache_dir=cache_dir,
+            force_retrain=force_retrain,
+            feature_cols=feature_cols,
+        )
 
-            model = None
+        if parallel and len(groups) >= self._PARALLEL_MIN_GROUPS:
+            # The pool already runs one fit per worker; keep each forest
+            # on a single job
+            _run_chunk = partial(_run_chunk, n_jobs=1)
 
-            if not force_retrain:
-                try:
-                    model, _ = load_cached_model(
-                        cache_dir,
-                        safe_facility,
-                        safe_item,
-                        model_name
-                    )
-                    cache_hit = model is not None
-                except Exception:
-                    model = None
-                    cache_hit = False
-
-            if model is None:
-                model, _ = train_random_forest(
-                    df=g,
-                    feature_cols=feature_cols,
-                    target_col="y"
-                )
-                save_cached_model(
-                    model,
-                    cache_dir,
-                    safe_facility,
-                    safe_item,
-                    model_name
-                )
-            future_df = forecast_future_demand(
-                model=model,
-                df_history=g,
-                feature_cols=feature_cols,
-                periods=periods
-            )
-            future_df["facility"] = facility
-            future_df["item"] = item
-
-            duration = round(time.time() - start, 3)
-
-            metric = {
-                "facility": facility,
-                "item": item,
-                "cache_hit": cache_hit,
-                "runtime_sec": duration
-            }
-            return future_df, metric
-
-
-        if parallel:
-            with ThreadPoolExecutor(max_workers=max_workers) as ex:
-                futures = [
-                    ex.submit(_worker, f, i, g)
-                    for f, i, g in groups
-                ]
+            # Several (facility, item) groups per task so short fits
+            # don't drown in submit/collect overhead
+            batch_size = max(1, int(batch_size))
+            chunks = [
+                groups[k:k + batch_size]
+                for k in range(0, len(groups), batch_size)
+            ]
+            def _collect(ex):
+                futures = [ex.submit(_run_chunk, chunk) for chunk in chunks]
                 for f in as_completed(futures):
-                    forecast_df, metric = f.result()
-                    results.append(forecast_df)
-                    metrics.append(metric)
+                    for forecast_df, metric in f.result():
+                        results.append(forecast_df)
+                        metrics.append(metric)
+
+            if executor is not None:
+                _collect(executor)
+            else:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as ex:
+                    _collect(ex)
         else:
-            for f, i, g in groups:
-                forecast_df, metric = _worker(f, i, g)
+            for forecast_df, metric in _run_chunk(groups):
                 results.append(forecast_df)
                 metrics.append(metric)
 
@@ -235,8 +301,11 @@ class ForecastAgent:
         # Take a sample to speed up SHAP computation
         X_sample = df[feature_cols].sample(min(sample_size, len(df)), random_state=42)
         
-        explainer = shap.Explainer(model, X_sample)
-        shap_values = explainer(X_sample)
+        # Tree-path-dependent TreeExplainer: exact for forests and needs no
+        # background data (shap.Explainer(model, X) runs interventional
+        # TreeSHAP over every background row)
+        explainer = shap.TreeExplainer(model)
+        shap_values = explainer(X_sample, check_additivity=False)
         
         return explainer, shap_values, X_sample
     
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 class InventoryRiskAgent:
@@ -21,34 +22,22 @@ class InventoryRiskAgent:
             if col not in df.columns:
                 df[col] = None
 
-        def classify(row):
+        doc = df["days_of_cover"].to_numpy(dtype=float, na_value=np.nan)
+        reorder = df["reorder_now"].fillna(False).to_numpy(dtype=bool)
+        # Normalize each distinct class once, then compare integer codes
+        vc_codes, vc_uniques = pd.factorize(df["volatility_class"])
+        vc_norm = pd.Index(vc_uniques).astype(str).str.strip().str.lower()
+        seasonal = np.isin(vc_codes, np.flatnonzero(vc_norm == "seasonal"))
+        erratic = np.isin(vc_codes, np.flatnonzero(vc_norm == "erratic"))
 
-            # Fail-safe: missing coverage is risky
-            if pd.isna(row.get("days_of_cover")):
-                return "HIGH"
+        # Default: structurally safe
+        risk = np.full(len(df), "LOW", dtype=object)
 
-            # Safe boolean check (numpy.bool_ aware)
-            if pd.notna(row.get("reorder_now")) and bool(row.get("reorder_now")):
-                return "HIGH"
+        # Medium risk conditions
+        risk[(doc <= 7) | seasonal] = "MEDIUM"
 
-            vc = str(row.get("volatility_class", "")).strip().lower()
+        # Severe risk conditions; missing coverage is risky (fail-safe)
+        risk[np.isnan(doc) | reorder | (doc <= 3) | erratic] = "HIGH"
 
-            # Severe risk conditions
-            if row["days_of_cover"] <= 3:
-                return "HIGH"
-
-            if vc == "erratic":
-                return "HIGH"
-
-            # Medium risk conditions
-            if row["days_of_cover"] <= 7 or vc == "seasonal":
-                return "MEDIUM"
-
-            # Default: structurally safe
-            return "LOW"
-
-
-        
-        df = df.copy()
-        df["inventory_risk"] = df.apply(classify, axis=1)
+        df["inventory_risk"] = risk
         return df
@@ -3,6 +3,128 @@
 from __future__ import annotations
 import pandas as pd
 import numpy as np
+from numba import njit
+
+_DAY_NS = 86_400_000_000_000
+_NAT = np.iinfo(np.int64).min
+_NO_ORDER = np.iinfo(np.int64).max
+
+
+def _normalize_key(s: pd.Series) -> pd.Series:
+    """
+    s.astype(str).str.strip().str.lower(), with the string work done once
+    per distinct value instead of once per row.
+    """
+    codes, uniques = pd.factorize(s)
+    out = pd.Index(uniques).astype(str).str.strip().str.lower().to_numpy()[codes]
+    missing = codes < 0
+    if missing.any():
+        # None / NaN / NA keep their own spellings ("none", "nan", "<na>")
+        out[missing] = s[missing].astype(str).str.strip().str.lower().to_numpy()
+    return pd.Series(out, index=s.index, dtype=object)
+
+
+# Explicit signature: numba (pinned in requirements.txt) compiles the kernel,
+# or loads it from its on-disk cache, when this module is imported, so the
+# first simulation request doesn't pay for JIT compilation
+@njit(
+    "(int64[:], int64[:], float64[:], int64[:],"
+    " float64[:], float64[:], float64[:], float64, float64)",
+    cache=True,
+)
+def _simulate_groups(
+    offsets, dates, demand, lt_days,
+    stock0, rp, avgd, order_up_to_days, min_order_qty,
+):
+    """
+    Day-by-day simulation over contiguous per-group slices.
+
+    Group k covers rows offsets[k]:offsets[k + 1], sorted by date; dates
+    and order arrivals are int64 nanoseconds (_NAT when no order).
+    Pending orders are kept in placement order so receipts and the
+    outstanding quantity are summed in the same order as before; the
+    queue is only rescanned on days something arrives.
+    """
+    n = dates.shape[0]
+    out_on_hand = np.empty(n)
+    out_position = np.empty(n)
+    out_cover = np.empty(n)
+    out_reorder = np.zeros(n, dtype=np.bool_)
+    out_qty = np.zeros(n)
+    out_arrival = np.full(n, _NAT, dtype=np.int64)
+    out_outstanding = np.empty(n)
+
+    order_due = np.empty(n, dtype=np.int64)
+    order_qty = np.empty(n)
+
+    for k in range(offsets.shape[0] - 1):
+        on_hand = stock0[k]
+        n_orders = 0
+        # Running totals over the pending orders, refreshed only when the
+        # queue changes instead of rescanning it every day
+        outstanding = 0.0
+        next_due = _NO_ORDER
+        can_order = (not np.isnan(rp[k])) and (not np.isnan(avgd[k])) and avgd[k] > 0
+
+        for t in range(offsets[k], offsets[k + 1]):
+            d = dates[t]
+
+            # 1) Receive orders arriving today
+            if next_due <= d:
+                recv_qty = 0.0
+                kept = 0
+                for j in range(n_orders):
+                    if order_due[j] <= d:
+                        recv_qty += order_qty[j]
+                    else:
+                        order_due[kept] = order_due[j]
+                        order_qty[kept] = order_qty[j]
+                        kept += 1
+                on_hand += recv_qty
+                n_orders = kept
+
+                outstanding = 0.0
+                next_due = _NO_ORDER
+                for j in range(n_orders):
+                    outstanding += order_qty[j]
+                    next_due = min(next_due, order_due[j])
+
+            # 2) Consume demand
+            on_hand = max(0.0, on_hand - demand[t])
+
+            # 3) Compute inventory position
+            inv_position = on_hand + outstanding
+            out_outstanding[t] = outstanding
+
+            # 4) Reorder decision
+            if can_order and inv_position <= rp[k]:
+                out_reorder[t] = True
+                # simple order-up-to: cover N days of demand
+                qty = max(min_order_qty, avgd[k] * order_up_to_days)
+                out_qty[t] = qty
+                out_arrival[t] = d + lt_days[t] * _DAY_NS
+                if qty > 0:
+                    order_due[n_orders] = out_arrival[t]
+                    order_qty[n_orders] = qty
+                    n_orders += 1
+                    # Appending keeps the placement-order sum exact
+                    outstanding += qty
+                    next_due = min(next_due, out_arrival[t])
+
+            # 5) Days of cover (based on avg demand param, fallback to demand)
+            if (not np.isnan(avgd[k])) and avgd[k] > 0:
+                denom = avgd[k]
+            else:
+                denom = max(demand[t], 1e-6)
+
+            out_on_hand[t] = on_hand
+            out_position[t] = inv_position
+            out_cover[t] = on_hand / denom
+
+    return (
+        out_on_hand, out_position, out_cover, out_reorder,
+        out_qty, out_arrival, out_outstanding,
+    )
 
 class InventorySimulationAgent:
     """
@@ -50,13 +172,17 @@ class InventorySimulationAgent:
             raise ValueError(f"reorder_df missing columns: {missing}")
 
         # ---------- Normalize types ----------
+        # Only the columns merged below are copied from inventory/reorder
         f = forecast_df.copy()
-        i = inventory_df.copy()
-        r = reorder_df.copy()
+        i = inventory_df[["facility", "item", stock_col]].copy()
+        r = reorder_df[
+            ["facility", "item", reorder_point_col, avg_demand_col]
+            + ([lead_time_col] if lead_time_col in reorder_df.columns else [])
+        ].copy()
 
         for df in (f, i, r):
             for c in ["facility", "item"]:
-                df[c] = df[c].astype(str).str.strip().str.lower()
+                df[c] = _normalize_key(df[c])
 
         f[date_col] = pd.to_datetime(f[date_col], errors="coerce")
         f = f.dropna(subset=[date_col]).sort_values([ "facility", "item", date_col ])
@@ -103,75 +229,54 @@ class InventorySimulationAgent:
             f[lead_time_col] = 7.0
 
         # ---------- Simulation ----------
-        rows = []
-
-        for (facility, item), g in f.groupby(["facility", "item"], sort=False):
-            g = g.sort_values(date_col).reset_index(drop=True)
-
-            on_hand = float(g.loc[0, stock_col])
-            on_order = []  # list of tuples: (arrival_date, qty)
-
-            rp = g[reorder_point_col].dropna()
-            rp = float(rp.iloc[0]) if len(rp) else np.nan
-
-            avgd = g[avg_demand_col].dropna()
-            avgd = float(avgd.iloc[0]) if len(avgd) else np.nan
-
-            # If we can't compute policy params, still simulate consumption (no ordering)
-            can_order = (not np.isnan(rp)) and (not np.isnan(avgd)) and avgd > 0
-
-            for t in range(len(g)):
-                d = g.loc[t, date_col]
-                demand = float(g.loc[t, demand_col]) if pd.notna(g.loc[t, demand_col]) else 0.0
-                lt = g.loc[t, lead_time_col]
-                lt_days = int(max(0, round(float(lt)))) if pd.notna(lt) else 7
-
-                # 1) Receive orders arriving today
-                if on_order:
-                    arriving = [x for x in on_order if x[0] <= d]
-                    if arriving:
-                        recv_qty = sum(q for _, q in arriving)
-                        on_hand += recv_qty
-                        on_order = [x for x in on_order if x[0] > d]
-
-                # 2) Consume demand
-                on_hand = max(0.0, on_hand - demand)
-
-                # 3) Compute inventory position
-                outstanding = sum(q for _, q in on_order) if on_order else 0.0
-                inv_position = on_hand + outstanding
-
-                # 4) Reorder decision
-                reorder_now = False
-                order_qty = 0.0
-                arrival_date = pd.NaT
-
-                if can_order and inv_position <= rp:
-                    reorder_now = True
-                    # simple order-up-to: cover N days of demand
-                    order_qty = max(min_order_qty, avgd * float(order_up_to_days))
-                    arrival_date = d + pd.Timedelta(days=lt_days)
-                    if order_qty > 0:
-                        on_order.append((arrival_date, order_qty))
-
-                # 5) Days of cover (based on avg demand param, fallback to demand)
-                denom = avgd if (pd.notna(avgd) and avgd > 0) else max(demand, 1e-6)
-                days_of_cover = on_hand / denom
-
-                rows.append({
-                    "facility": facility,
-                    "item": item,
-                    "ds": d,
-                    "forecast": demand,
-                    "stock_on_hand": round(on_hand, 2),
-                    "inventory_position": round(inv_position, 2),
-                    "days_of_cover": round(days_of_cover, 2),
-                    "reorder_point": None if np.isnan(rp) else round(rp, 2),
-                    "lead_time_days": lt_days,
-                    "reorder_now": bool(reorder_now),
-                    "order_qty": round(order_qty, 2),
-                    "order_arrival_ds": arrival_date if pd.notna(arrival_date) else None,
-                    "outstanding_orders_qty": round(outstanding, 2),
-                })
-
-        return pd.DataFrame(rows)
+        # Rows are sorted by (facility, item, date), so every group is one
+        # contiguous slice; the day loop runs over plain arrays
+        f = f.reset_index(drop=True)
+        keys = f[["facility", "item"]]
+        starts = np.flatnonzero(
+            (keys != keys.shift()).any(axis=1).to_numpy()
+        )
+        offsets = np.append(starts, len(f)).astype(np.int64)
+
+        # Policy params: first non-null per group
+        grouped = f.groupby(["facility", "item"], sort=False, observed=True)
+        rp = grouped[reorder_point_col].first().to_numpy(dtype=np.float64)
+        avgd = grouped[avg_demand_col].first().to_numpy(dtype=np.float64)
+        stock0 = f[stock_col].to_numpy(dtype=np.float64)[starts]
+
+        dates = f[date_col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        demand = f[demand_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        demand = np.where(np.isnan(demand), 0.0, demand)
+        lt = f[lead_time_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        lt_days = np.where(
+            np.isnan(lt), 7, np.maximum(0, np.rint(np.nan_to_num(lt)))
+        ).astype(np.int64)
+
+        (
+            on_hand, position, cover, reorder_now,
+            order_qty, arrival, outstanding,
+        ) = _simulate_groups(
+            offsets, dates, demand, lt_days,
+            stock0, rp, avgd, float(order_up_to_days), float(min_order_qty),
+        )
+
+        rp_rows = np.repeat(rp, np.diff(offsets))
+        arrival_ds = pd.to_datetime(
+            np.where(arrival == _NAT, np.datetime64("NaT", "ns"), arrival.view("datetime64[ns]"))
+        )
+
+        return pd.DataFrame({
+            "facility": f["facility"].to_numpy(),
+            "item": f["item"].to_numpy(),
+            "ds": f[date_col].to_numpy(),
+            "forecast": demand,
+            "stock_on_hand": np.round(on_hand, 2),
+            "inventory_position": np.round(position, 2),
+            "days_of_cover": np.round(cover, 2),
+            "reorder_point": np.round(rp_rows, 2),
+            "lead_time_days": lt_days,
+            "reorder_now": reorder_now,
+            "order_qty": np.round(order_qty, 2),
+            "order_arrival_ds": arrival_ds,
+            "outstanding_orders_qty": np.round(outstanding, 2),
+        })
@@ -1,5 +1,20 @@
 import pandas as pd
 
+
+def _top_rows(df, col, n, largest):
+    """
+    First `n` rows of df sorted by `col` (missing values last), without
+    sorting the whole frame.
+    """
+    if len(df) <= n:
+        return df.sort_values(col, ascending=not largest, kind="stable")
+    top = df.nlargest(n, col) if largest else df.nsmallest(n, col)
+    if len(top) < n:
+        # nlargest/nsmallest skip missing values; sort_values puts them last
+        top = pd.concat([top, df[df[col].isna()].head(n - len(top))])
+    return top
+
+
 class NarrativeAgent:
     """
     Rule-based executive narrative generator (COO-level).
@@ -67,14 +82,10 @@ class NarrativeAgent:
         # Top exposure items
         # -----------------------------
         if "days_of_cover" in reorder_df.columns:
-            top_risk = reorder_df.sort_values(
-                "days_of_cover", ascending=True
-            ).head(5)
+            top_risk = _top_rows(reorder_df, "days_of_cover", 5, largest=False)
         else:
             # fallback to reorder pressure
-            top_risk = reorder_df.sort_values(
-                "reorder_point", ascending=False
-            ).head(5)   
+            top_risk = _top_rows(reorder_df, "reorder_point", 5, largest=True)
         # -----------------------------
         # Narrative
         # -----------------------------
@@ -114,15 +125,17 @@ Erratic demand is a **key driver of safety stock pressure and reorder volatility
 ### 🚨 Most Exposed Items (Lowest Days of Cover)
 """
 
-        for _, r in top_risk.iterrows():
-            summary += (
+        # Collected and joined once rather than grown with +=
+        parts = [summary]
+        for r in top_risk.to_dict("records"):
+            parts.append(
                 f"- **{r['item']}** at **{r['facility']}** | "
                 f"{'Days of Cover: ' + str(round(r['days_of_cover'], 1)) if 'days_of_cover' in r else 'ROP: ' + str(r['reorder_point'])} | "
                 f"Risk: {r.get('inventory_risk', 'Unknown')} | "
                 f"Volatility: {r.get('volatility_class', 'Unknown')}\n"
             )
 
-        summary += """
+        parts.append("""
 ---
 
 ### ✅ Executive Recommendations
@@ -135,9 +148,9 @@ Erratic demand is a **key driver of safety stock pressure and reorder volatility
 - Revisit service levels for erratic-demand SKUs
 - Segment inventory policies by volatility class
 - Consider inventory pooling or demand smoothing for unstable items
-"""
+""")
 
-        return summary.strip()
+        return "".join(parts).strip()
     
 
     def generate_decision_summary(self, decision_df):
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 class ReasoningAgent:
@@ -10,7 +11,13 @@ class ReasoningAgent:
 
         avg_stock = df["stock_on_hand"].mean()
         avg_lead = df["lead_time_days"].mean()
-        demand_trend = forecast_df["forecast"].diff().mean()
+
+        forecast = forecast_df["forecast"].to_numpy(dtype=float)
+        if len(forecast) > 1 and not np.isnan(forecast).any():
+            # Mean day-over-day change telescopes to (last - first) / (n - 1)
+            demand_trend = (forecast[-1] - forecast[0]) / (len(forecast) - 1)
+        else:
+            demand_trend = forecast_df["forecast"].diff().mean()
 
         if demand_trend > 0:
             explanations.append("📈 Forecast shows increasing demand trend")
@@ -16,33 +16,43 @@ class ReorderAgent:
         demand_col: str = "forecast",
         lead_time_col: str = "lead_time_days",
         service_level_z: float = 1.65,
+        group_cols=("facility", "item"),
     ) -> pd.DataFrame:
-
-        required = {"facility", "item", demand_col, lead_time_col}
+        """
+        One row per `group_cols` key (default facility, item). Extra group
+        columns such as `scenario` let several what-if variants of the
+        forecast go through a single pass.
+        """
+        group_cols = list(group_cols)
+        required = {"facility", "item", demand_col, lead_time_col, *group_cols}
         missing = required - set(forecast_df.columns)
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
 
-        results = []
-
-        for (facility, item), g in forecast_df.groupby(["facility", "item"]):
-            avg_demand = g[demand_col].mean()
-            std_demand = g[demand_col].std() or 0.0
-            lead_time = g[lead_time_col].mean()
-
-            if pd.isna(lead_time) or lead_time <= 0:
-                continue
-
-            safety_stock = service_level_z * std_demand * (lead_time ** 0.5)
-            reorder_point = avg_demand * lead_time + safety_stock
-
-            results.append({
-                "facility": facility,
-                "item": item,
-                "avg_daily_demand": round(avg_demand, 2),
-                "lead_time_days": round(lead_time, 1),
-                "safety_stock": round(safety_stock, 2),
-                "reorder_point": round(reorder_point, 2),
-            })
-
-        return pd.DataFrame(results)
+        # Per-group moments in one grouped pass (compiled aggregations).
+        # The grouped kernels sum with compensation, so a mean can differ
+        # from a per-group Series.mean() in its last bit; a mean sitting on
+        # a rounding tie (e.g. lead time 5.45) may round the other way.
+        grouped = forecast_df.groupby(group_cols, observed=True)
+        stats = pd.DataFrame({
+            "avg_demand": grouped[demand_col].mean(),
+            "std_demand": grouped[demand_col].std(),
+            "lead_time": grouped[lead_time_col].mean(),
+        })
+
+        # Groups without a usable lead time get no reorder point
+        stats = stats[stats["lead_time"] > 0]
+
+        avg_demand = stats["avg_demand"].to_numpy()
+        std_demand = stats["std_demand"].to_numpy()
+        lead_time = stats["lead_time"].to_numpy()
+
+        safety_stock = service_level_z * std_demand * (lead_time ** 0.5)
+        reorder_point = avg_demand * lead_time + safety_stock
+
+        out = stats.index.to_frame(index=False)
+        out["avg_daily_demand"] = np.round(avg_demand, 2)
+        out["lead_time_days"] = np.round(lead_time, 1)
+        out["safety_stock"] = np.round(safety_stock, 2)
+        out["reorder_point"] = np.round(reorder_point, 2)
+        return out
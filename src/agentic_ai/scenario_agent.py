@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 class ScenarioAgent:
@@ -24,3 +25,42 @@ class ScenarioAgent:
         df["lead_time_days"] = df["lead_time_days"] + extra_days
         df["scenario"] = f"Lead Time +{extra_days}d"
         return df
+
+    def build_scenarios(
+        self,
+        forecast_df: pd.DataFrame,
+        surge_pct: float = 0.30,
+        extra_days: int = 7,
+        key_cols=("facility", "item"),
+    ) -> pd.DataFrame:
+        """
+        Baseline, demand surge and lead-time shock stacked into one long
+        frame, tagged by an ordered categorical `scenario` column, so the
+        reorder computation runs once over all three.
+
+        Only `key_cols`, forecast and lead_time_days are carried: the
+        perturbations are broadcast over those arrays instead of cloning
+        the whole forecast frame per scenario.
+        """
+        labels = [
+            "Baseline",
+            f"Demand +{int(round(surge_pct * 100))}%",
+            f"Lead Time +{extra_days}d",
+        ]
+        n = len(forecast_df)
+        rows = np.tile(np.arange(n), len(labels))
+
+        fc = forecast_df["forecast"].to_numpy()
+        lt = forecast_df["lead_time_days"].to_numpy()
+
+        long_df = pd.DataFrame(
+            {c: forecast_df[c].array.take(rows) for c in key_cols}
+        )
+        long_df["forecast"] = np.concatenate([fc, fc * (1 + surge_pct), fc])
+        long_df["lead_time_days"] = np.concatenate([lt, lt, lt + extra_days])
+        long_df["scenario"] = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(labels)), n),
+            categories=labels,
+            ordered=True,
+        )
+        return long_df
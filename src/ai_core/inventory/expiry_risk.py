@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 
@@ -18,7 +19,7 @@ class ExpiryRiskEngine:
     """
 
     def compute(self, lots_df: pd.DataFrame, today=None) -> ExpiryRiskResult:
-        df = lots_df.copy()
+        df = lots_df.copy(deep=False)  # columns are replaced, never written in place
 
         if df.empty:
             return ExpiryRiskResult(
@@ -40,15 +41,21 @@ class ExpiryRiskEngine:
 
         total_qty = float(df["qty_on_hand"].sum())
 
-        def expiring_within(days: int) -> float:
-            cutoff = today + pd.Timedelta(days=days)
-            return float(
-                df.loc[df["expiry_date"] <= cutoff, "qty_on_hand"].sum()
-            )
+        # One sort + running total answers every cutoff; lots without a
+        # valid expiry date never count as expiring
+        dated = df.loc[df["expiry_date"].notna(), ["expiry_date", "qty_on_hand"]]
+        dated = dated.sort_values("expiry_date", kind="stable")
+        expiry = dated["expiry_date"].to_numpy(dtype="datetime64[ns]")
+        cum_qty = np.cumsum(np.nan_to_num(dated["qty_on_hand"].to_numpy()))
 
-        exp_30 = expiring_within(30)
-        exp_60 = expiring_within(60)
-        exp_90 = expiring_within(90)
+        cutoffs = np.array(
+            [today + pd.Timedelta(days=d) for d in (30, 60, 90)],
+            dtype="datetime64[ns]",
+        )
+        idx = np.searchsorted(expiry, cutoffs, side="right")
+        exp_30, exp_60, exp_90 = (
+            float(cum_qty[k - 1]) if k > 0 else 0.0 for k in idx
+        )
 
         pct_at_risk_90 = exp_90 / total_qty if total_qty > 0 else 0.0
 
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -24,37 +25,41 @@ class FEFOAllocator:
         # FEFO: earliest expiry first
         df = df.sort_values("expiry_date")
 
-        remaining_qty = float(required_qty)
-        allocations = []
+        required_qty = float(required_qty)
 
-        for _, row in df.iterrows():
-            if remaining_qty <= 0:
-                break
+        # Each lot takes what is still needed after every earlier lot:
+        # min(available, required - stock before it), floored at zero
+        available = df["qty_on_hand"].to_numpy()
+        available = np.where(available > 0, available, 0.0)
+        cum_qty = np.cumsum(available)
+        before = cum_qty - available
+        take_qty = np.minimum(available, np.maximum(required_qty - before, 0.0))
+        taken = np.flatnonzero(take_qty > 0)
 
-            available = float(row["qty_on_hand"])
-            if available <= 0:
-                continue
-
-            take_qty = min(available, remaining_qty)
-
-            allocations.append({
-                "lot_id": row["lot_id"],
+        allocations = [
+            {
+                "lot_id": lot_id,
                 "expiry_date": (
-                    row["expiry_date"].date().isoformat()
-                    if pd.notnull(row["expiry_date"])
+                    expiry_date.date().isoformat()
+                    if pd.notnull(expiry_date)
                     else None
                 ),
-                "allocated_qty": round(take_qty, 2),
+                "allocated_qty": round(qty, 2),
                 "status": "ALLOCATED"
-            })
-
-            remaining_qty -= take_qty
+            }
+            for lot_id, expiry_date, qty in zip(
+                df["lot_id"].iloc[taken],
+                df["expiry_date"].iloc[taken],
+                take_qty[taken].tolist(),
+            )
+        ]
 
-        if remaining_qty > 0:
+        total_qty = float(cum_qty[-1])
+        if total_qty < required_qty:
             allocations.append({
                 "lot_id": "UNFULFILLED",
                 "expiry_date": None,
-                "allocated_qty": round(remaining_qty, 2),
+                "allocated_qty": round(required_qty - total_qty, 2),
                 "status": "INSUFFICIENT_STOCK"
             })
 
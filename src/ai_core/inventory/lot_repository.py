@@ -10,6 +10,19 @@ LOTS_PATH = (
     PROJECT_ROOT / "data" / "lakehouse" / "inventory" / "lots"
 )
 
+_LOTS_QUERY = f"""
+SELECT
+    facility,
+    item,
+    lot_id,
+    expiry_date,
+    qty_on_hand,
+    supplier_id
+FROM delta_scan('{LOTS_PATH.as_posix().replace("'", "''")}')
+WHERE facility = ?
+  AND item = ?
+"""
+
 
 class LotRepository:
     """
@@ -21,16 +34,8 @@ class LotRepository:
         self.con = duckdb.connect()
 
     def get_lots(self, facility: str, item: str):
-        query = f"""
-        SELECT
-            facility,
-            item,
-            lot_id,
-            expiry_date,
-            qty_on_hand,
-            supplier_id
-        FROM delta_scan('{LOTS_PATH.as_posix()}')
-        WHERE facility = '{facility}'
-          AND item = '{item}'
-        """
-        return self.con.execute(query).df()
+        # Keys are bound as parameters: no quoting/injection issues, and the
+        # statement text stays the same across calls
+        return self.con.execute(
+            _LOTS_QUERY, [facility, item]
+        ).df()
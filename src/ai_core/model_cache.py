@@ -1,6 +1,7 @@
 # src/ai_core/model_cache.py
 
 import os
+import tempfile
 import joblib
 
 def _model_path(cache_dir, facility, item, model_name):
@@ -31,4 +32,13 @@ def save_cached_model(model, cache_dir, facility, item, model_name):
     Persist trained model to disk
     """
     path = _model_path(cache_dir, facility, item, model_name)
-    joblib.dump(model, path)
+    # Write aside and swap in, so concurrent fits of the same series never
+    # leave (or let a reader load) a half-written pickle
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(model, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
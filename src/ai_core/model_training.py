@@ -1,22 +1,38 @@
 # src/ai_core/model_training.py
 
+import os
+
 import joblib
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
+# Forest jobs for a standalone fit: RF_N_JOBS, else this process's share of
+# the CPUs when the API runs UVICORN_WORKERS processes side by side
+RF_N_JOBS = int(os.getenv(
+    "RF_N_JOBS",
+    max(1, (os.cpu_count() or 1) // int(os.getenv("UVICORN_WORKERS", "1"))),
+))
+
 def train_random_forest(
     df,
     feature_cols,
     target_col,
     test_size=0.2,
     random_state=42,
-    save_model_path=None
+    save_model_path=None,
+    n_jobs=None
 ):
     """
     Generic Random Forest trainer (used for demand or lead time).
+
+    `n_jobs` is handed to the forest and defaults to RF_N_JOBS. Callers
+    that already parallelize across models, such as the batch forecast
+    pools, pass n_jobs=1 so the two levels don't oversubscribe the CPUs.
     """
+    if n_jobs is None:
+        n_jobs = RF_N_JOBS
 
     X = df[feature_cols]
     y = df[target_col]
@@ -28,7 +44,8 @@ def train_random_forest(
     model = RandomForestRegressor(
         n_estimators=200,
         max_depth=10,
-        random_state=random_state
+        random_state=random_state,
+        n_jobs=n_jobs
     )
 
     model.fit(X_train, y_train)
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from typing import Dict, Optional, Tuple
+from cachetools import LRUCache
 import pandas as pd
 import pulp
 
@@ -28,8 +29,19 @@ class ProcurementOptimizer:
     - decision vars: x_s (order quantity), y_s (binary: whether supplier is used)
     - objective: procurement + expiry_penalty + shortage_penalty
     - constraints: demand (soft), capacity, MOQ enforced by y_s, exposure cap
+
+    Reusing one instance across calls warm-starts CBC from the previous
+    solution for the same facility-item (a MIP start only; CBC still
+    proves optimality and drops the start if it is infeasible). Only the
+    latest plan of the `warm_start_slots` most recently solved
+    facility-items is kept. Supplier frames that are not for a single
+    facility-item are solved cold.
     """
 
+    def __init__(self, warm_start_slots: int = 256):
+        # (facility, item) -> {supplier_id: (qty, used_flag)}
+        self._last_solution = LRUCache(maxsize=warm_start_slots)
+
     def optimize(
         self,
         suppliers_df: pd.DataFrame,
@@ -54,14 +66,20 @@ class ProcurementOptimizer:
         # Create MILP model
         model = pulp.LpProblem("ProcurementOptimization", pulp.LpMinimize)
 
-        # Decision variables
-        x = {}  # order quantity per supplier
-        y = {}  # binary use flag (for MOQ enforcement)
+        # Supplier columns as plain arrays (one entry per supplier)
+        sids = df["supplier_id"].tolist()
+        prices = df["price_per_unit"].to_numpy(dtype=float)
+        caps = df["capacity_per_period"].to_numpy(dtype=float)
+        moqs = df["min_order_qty"].to_numpy(dtype=float)
+        names = (
+            df["supplier_name"].tolist()
+            if "supplier_name" in df.columns
+            else [""] * len(df)
+        )
 
-        for i, r in df.iterrows():
-            sid = r["supplier_id"]
-            x[sid] = pulp.LpVariable(f"x_{sid}", lowBound=0, cat="Continuous")
-            y[sid] = pulp.LpVariable(f"y_{sid}", lowBound=0, upBound=1, cat="Binary")
+        # Decision variables
+        x = pulp.LpVariable.dicts("x", sids, lowBound=0, cat="Continuous")  # order quantity per supplier
+        y = pulp.LpVariable.dicts("y", sids, lowBound=0, upBound=1, cat="Binary")  # use flag (MOQ enforcement)
 
         # Shortage variable (soft demand)
         shortage = pulp.LpVariable("shortage", lowBound=0, cat="Continuous")
@@ -74,16 +92,13 @@ class ProcurementOptimizer:
         model += pulp.lpSum(x.values()) + shortage >= required_qty, "DemandSoft"
 
         # Per-supplier constraints: capacity, MOQ with binary, exposure cap
-        for i, r in df.iterrows():
-            sid = r["supplier_id"]
-            cap = float(r["capacity_per_period"])
-            moq = float(r["min_order_qty"])
-
+        share_cap = max_share * required_qty
+        for sid, cap, moq in zip(sids, caps.tolist(), moqs.tolist()):
             # Capacity: x_s <= cap
             model += x[sid] <= cap, f"Cap_{sid}"
 
             # Exposure cap: x_s <= max_share * required
-            model += x[sid] <= max_share * required_qty, f"ShareCap_{sid}"
+            model += x[sid] <= share_cap, f"ShareCap_{sid}"
 
             # MOQ enforced by binary:
             # x_s >= MOQ * y_s
@@ -96,42 +111,57 @@ class ProcurementOptimizer:
         # Objective components
         # ------------------------
 
-        procurement_cost = pulp.lpSum(
-            x[r["supplier_id"]] * float(r["price_per_unit"])
-            for _, r in df.iterrows()
+        # Per-unit cost of each supplier, with the weighted procurement and
+        # expiry-penalty (value * pct_at_risk_90 proxy) terms folded into
+        # one coefficient
+        unit_cost = (
+            prices * config.weight_procurement
+            + prices * config.expiry_penalty_rate * pct_at_risk_90 * config.weight_expiry
         )
 
-        # Expiry penalty proxy: proportional to value * pct_at_risk_90
-        expiry_cost = pulp.lpSum(
-            x[r["supplier_id"]] * float(r["price_per_unit"]) * config.expiry_penalty_rate * pct_at_risk_90
-            for _, r in df.iterrows()
-        )
-
-        shortage_cost = shortage * config.shortage_penalty_per_unit
-
         # Weighted single-objective
         model += (
-            config.weight_procurement * procurement_cost
-            + config.weight_expiry * expiry_cost
-            + config.weight_shortage * shortage_cost
+            pulp.LpAffineExpression(zip([x[sid] for sid in sids], unit_cost.tolist()))
+            + shortage * config.shortage_penalty_per_unit * config.weight_shortage
         ), "TotalCost"
 
+        # MIP start from the previous plan for the same facility-item
+        problem = None
+        if {"facility", "item"}.issubset(df.columns):
+            pairs = set(zip(df["facility"].tolist(), df["item"].tolist()))
+            if len(pairs) == 1:
+                problem = pairs.pop()
+        previous = self._last_solution.get(problem, {}) if problem is not None else {}
+        warm = [sid for sid in sids if sid in previous]
+        for sid in warm:
+            qty, used = previous[sid]
+            x[sid].setInitialValue(qty)
+            y[sid].setInitialValue(used)
+
         # Solve
-        status = model.solve(pulp.PULP_CBC_CMD(msg=False))
+        status = model.solve(pulp.PULP_CBC_CMD(msg=False, warmStart=bool(warm)))
 
         # Collect results
+        plan = [
+            (
+                float(pulp.value(x[sid]) or 0.0),
+                int(round(float(pulp.value(y[sid]) or 0.0))),
+            )
+            for sid in sids
+        ]
+        if problem is not None:
+            # Replaces this facility-item's plan as its next MIP start
+            self._last_solution[problem] = dict(zip(sids, plan))
+
         sol = []
-        for _, r in df.iterrows():
-            sid = r["supplier_id"]
-            qty = float(pulp.value(x[sid]) or 0.0)
-            used = int(round(float(pulp.value(y[sid]) or 0.0)))
+        for sid, name, price, (qty, used) in zip(sids, names, prices.tolist(), plan):
             if qty > 0:
                 sol.append({
                     "supplier_id": sid,
-                    "supplier_name": r.get("supplier_name", ""),
+                    "supplier_name": name,
                     "ordered_qty": round(qty, 2),
                     "used_flag": used,
-                    "price_per_unit": float(r["price_per_unit"])
+                    "price_per_unit": price
                 })
 
         shortage_val = float(pulp.value(shortage) or 0.0)
@@ -13,7 +13,7 @@ class AllocationEngine:
         mode: str = "normal"
     ) -> pd.DataFrame:
 
-        df = ranked_df.copy()
+        df = ranked_df
 
         if df.empty:
             raise ValueError("No suppliers available for allocation")
@@ -25,31 +25,38 @@ class AllocationEngine:
 
         # Convert supplier_score → allocation weight
         # lower score = better supplier
-        df["weight"] = 1 / df["supplier_score"]
-        df["weight"] = df["weight"] / df["weight"].sum()
+        weight = 1 / df["supplier_score"]
+        weight = weight / weight.sum()
 
         remaining_qty = required_qty
         allocations = []
 
-        for _, row in df.iterrows():
-
-            supplier_cap = min(
-                row["capacity_per_period"],
-                required_qty * max_share
-            )
-
-            proposed_qty = required_qty * row["weight"]
+        # Allocation is sequential (remaining_qty), so the loop stays, but it
+        # walks plain column lists instead of building a Series per row
+        share_cap = required_qty * max_share
+        for supplier_id, supplier_name, score, cap, moq, w in zip(
+            df["supplier_id"].tolist(),
+            df["supplier_name"].tolist(),
+            df["supplier_score"].tolist(),
+            df["capacity_per_period"].tolist(),
+            df["min_order_qty"].tolist(),
+            weight.tolist(),
+        ):
+
+            supplier_cap = min(cap, share_cap)
+
+            proposed_qty = required_qty * w
             allocated_qty = min(proposed_qty, supplier_cap, remaining_qty)
 
             # Respect MOQ
-            if allocated_qty < row["min_order_qty"]:
+            if allocated_qty < moq:
                 continue
 
             allocations.append({
-                "supplier_id": row["supplier_id"],
-                "supplier_name": row["supplier_name"],
+                "supplier_id": supplier_id,
+                "supplier_name": supplier_name,
                 "allocated_qty": round(allocated_qty, 2),
-                "supplier_score": row["supplier_score"],
+                "supplier_score": score,
                 "mode": mode
             })
 
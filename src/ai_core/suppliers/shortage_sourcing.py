@@ -37,6 +37,8 @@ class ShortageSourcingEngine:
     def __init__(self):
         self.repo = SupplierRepository()
         self.allocator = AllocationEngine()
+        # Long-lived so repeated plans warm-start from the previous solve
+        self.optimizer = ProcurementOptimizer()
 
     def is_shortage(self, ctx: ShortageContext) -> (bool, str):
         if ctx.days_of_cover <= ctx.trigger_doc_days:
@@ -70,9 +72,7 @@ class ShortageSourcingEngine:
         ranked = ranker.rank(pool)
 
         # Optimize procurement using MILP (Phase 5)
-        opt = ProcurementOptimizer()
-
-        solution, meta = opt.optimize(
+        solution, meta = self.optimizer.optimize(
             suppliers_df=ranked,
             required_qty=ctx.required_qty,
             pct_at_risk_90=0.0,  # emergency: expiry risk downweighted
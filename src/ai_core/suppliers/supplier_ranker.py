@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 DEFAULT_WEIGHTS = {
@@ -7,6 +8,12 @@ DEFAULT_WEIGHTS = {
     "risk": 0.10
 }
 
+def _max(values: np.ndarray) -> float:
+    """NaN-skipping max like Series.max(); NaN when nothing is left."""
+    values = values[~np.isnan(values)]
+    return values.max() if values.size else np.nan
+
+
 class SupplierRanker:
 
     def __init__(self, weights=None):
@@ -15,20 +22,28 @@ class SupplierRanker:
     def rank(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
 
-        df["price_norm"] = df["price_per_unit"] / df["price_per_unit"].max()
+        # Score on plain float arrays; the frame only receives the results
+        price = df["price_per_unit"].to_numpy(dtype=np.float64, na_value=np.nan)
+        lead_time = (
+            df["lead_time_days"].to_numpy(dtype=np.float64, na_value=np.nan)
+            + df["lead_time_std"].to_numpy(dtype=np.float64, na_value=np.nan)
+        )
+        risk = df["risk_score"].to_numpy(dtype=np.float64, na_value=np.nan)
 
-        df["lead_time_norm"] = (
-            df["lead_time_days"] + df["lead_time_std"]
-        ) / (df["lead_time_days"] + df["lead_time_std"]).max()
+        price_norm = price / _max(price)
+        lead_time_norm = lead_time / _max(lead_time)
+        reliability_risk = 1 - df["reliability_score"].to_numpy(dtype=np.float64, na_value=np.nan)
 
-        df["reliability_risk"] = 1 - df["reliability_score"]
+        df["price_norm"] = price_norm
+        df["lead_time_norm"] = lead_time_norm
+        df["reliability_risk"] = reliability_risk
         df["risk_norm"] = df["risk_score"]
 
         df["supplier_score"] = (
-            self.weights["price"] * df["price_norm"]
-            + self.weights["lead_time"] * df["lead_time_norm"]
-            + self.weights["reliability"] * df["reliability_risk"]
-            + self.weights["risk"] * df["risk_norm"]
+            self.weights["price"] * price_norm
+            + self.weights["lead_time"] * lead_time_norm
+            + self.weights["reliability"] * reliability_risk
+            + self.weights["risk"] * risk
         )
 
         df["rank"] = df["supplier_score"].rank(method="dense")
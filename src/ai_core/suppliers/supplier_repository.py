@@ -1,3 +1,4 @@
+import threading
 import duckdb
 from pathlib import Path
 
@@ -8,27 +9,48 @@ SUPPLIER_POOL_PATH = (
     PROJECT_ROOT / "data" / "lakehouse" / "suppliers" / "supplier_pool"
 )
 
+_SUPPLIERS_QUERY = f"""
+SELECT
+    facility,
+    item,
+    supplier_id,
+    supplier_name,
+    price_per_unit,
+    lead_time_days,
+    lead_time_std,
+    reliability_score,
+    capacity_per_period,
+    min_order_qty,
+    contracted,
+    risk_score
+FROM delta_scan('{SUPPLIER_POOL_PATH.as_posix().replace("'", "''")}')
+WHERE facility = ?
+  AND item = ?
+"""
+
+
+_CON = None
+_CON_LOCK = threading.Lock()
+
+
+def _shared_connection():
+    """One in-process DuckDB database (extensions loaded once) for all repositories."""
+    global _CON
+    with _CON_LOCK:
+        if _CON is None:
+            _CON = duckdb.connect()
+        return _CON
+
+
 class SupplierRepository:
     def __init__(self):
-        self.con = duckdb.connect()
+        # Own cursor on the shared database: safe to use from this
+        # instance's thread without sharing a connection handle
+        self.con = _shared_connection().cursor()
 
     def get_suppliers(self, facility: str, item: str):
-        query = f"""
-        SELECT
-            facility,
-            item,
-            supplier_id,
-            supplier_name,
-            price_per_unit,
-            lead_time_days,
-            lead_time_std,
-            reliability_score,
-            capacity_per_period,
-            min_order_qty,
-            contracted,
-            risk_score
-        FROM delta_scan('{SUPPLIER_POOL_PATH.as_posix()}')
-        WHERE facility = '{facility}'
-          AND item = '{item}'
-        """
-        return self.con.execute(query).df()
+        # Keys are bound as parameters: no quoting/injection issues, and the
+        # statement text stays the same across calls
+        return self.con.execute(
+            _SUPPLIERS_QUERY, [facility, item]
+        ).df()
@@ -5,19 +5,17 @@ def classify_volatility(df: pd.DataFrame, y_col="y", group_cols=("facility","ite
     """
     Returns dataframe with facility,item, mean, std, cv, volatility_label
     """
-    g = df.groupby(list(group_cols))[y_col].agg(["mean","std"]).reset_index()
+    # Aggregate in float64 even if y arrives downcast to float32
+    y = df[y_col].astype(float)
+    g = y.groupby([df[c] for c in group_cols], observed=True).agg(["mean","std"]).reset_index()
     g["mean"] = g["mean"].astype(float)
     g["std"] = g["std"].fillna(0).astype(float)
     g["cv"] = np.where(g["mean"] <= 0, np.nan, g["std"] / g["mean"])
 
-    def label(cv):
-        if pd.isna(cv):
-            return "Unknown"
-        if cv < 0.25:
-            return "Low"
-        if cv <= 0.60:
-            return "Medium"
-        return "High"
-
-    g["volatility"] = g["cv"].apply(label)
+    # Categorical label: Low / Medium / High, Unknown when cv is undefined
+    cv = g["cv"].to_numpy()
+    codes = np.select([np.isnan(cv), cv < 0.25, cv <= 0.60], [3, 0, 1], default=2)
+    g["volatility"] = pd.Categorical.from_codes(
+        codes, categories=["Low", "Medium", "High", "Unknown"]
+    )
     return g